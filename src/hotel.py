@@ -8,37 +8,172 @@ hence the management of seeing SSN easily.
 """
 
 from abc import ABCMeta, abstractmethod
+import argparse
+from array import array
+import bisect
+from collections.abc import Mapping, MutableMapping
+import contextlib
+import copy
+import csv
+import datetime
+import functools
+import heapq
+import itertools
 import json
+import marshal
+import math
+import operator
 import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import weakref
+import zlib
 # Typing is used for type-hinting
-from typing import Collection, Any
+from typing import Callable, Collection, Any
 
 
-class JsonHandling:
+def _journal_default(value: Any) -> str:
+    """
+    Converts journal arguments json can't, dates (of reservations) are written as YYYY-MM-DD.
+
+    Args:
+        value (Any): Argument of a journaled call
+
+    Raises:
+        TypeError: Not a date
+
+    Returns:
+        str: The date in iso format
+    """
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _fsync_directory(path: str):
+    """
+    Forces the entries of a directory to disk, so a file renamed or created in it
+    survives a crash. Does nothing where directories can't be opened (Windows).
+
+    Args:
+        path (str): Path of the directory
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class StorageInterface(metaclass=ABCMeta):
+    """
+    All storage backends used by HotelManager is derived from StorageInterface.
+    A backend stores the collections "users", "rooms", "active", "old" and
+    "reservations" in the same layout as the json file.
+    """
+
+    # Backends implementing append_journal, read_journal and clear_journal set it
+    SUPPORTS_JOURNAL = False
+
+    @abstractmethod
+    def pack_data(self, json_data: dict, dirty: dict | None = None):
+        """
+        Stores the collections in json_data.
+        Collections may be read only mappings (see _StorageView) that format each record
+        when it is read, use dict() on them when the whole collection is needed as a dict.
+
+        Args:
+            json_data (dict): All collections, same layout as the json file
+            dirty (dict | None, optional): Collection -> changed keys (None for all keys)
+                                    since the last call. None if everything should be stored.
+        """
+
+    @abstractmethod
+    def unpack_data(self) -> dict:
+        """
+        Loads all stored collections.
+
+        Returns:
+            dict: Collections in the same layout as the json file
+        """
+
+    def append_journal(self, records: list[dict]):
+        """Appends records to the journal, only implemented by backends supporting journal mode"""
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support journal mode")
+
+    def read_journal(self) -> list[dict]:
+        """Reads all records from the journal"""
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support journal mode")
+
+    def clear_journal(self):
+        """Empties the journal"""
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support journal mode")
+
+    def close(self):
+        """Releases resources held by the backend, nothing by default"""
+
+
+class JsonHandling(StorageInterface):
     """
     Class for handling json data from json files
     """
 
-    def __init__(self, filename: str = "hotel.json"):
+    SUPPORTS_JOURNAL = True
+    # When a write is forced to disk: every write, every fsync_batch:th write or never (leave it to the OS)
+    FSYNC_POLICIES = ("always", "batched", "never")
+    # File extension of the data file, subclasses storing another format changes it
+    EXTENSION = ".json"
+
+    def __init__(self,
+                 filename: str = "hotel.json",
+                 fsync: str = "always",
+                 fsync_batch: int = 10):
         """
         Constructor for JsonHandling
 
         Args:
             filename (str, optional): Name of the file to be used. Defaults to hotel.json.
+            fsync (str, optional): fsync policy, "always", "batched" or "never". Defaults to "always".
+            fsync_batch (int, optional): Writes per fsync with the "batched" policy. Defaults to 10.
         """
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.fsync = fsync
+        self.fsync_batch = fsync_batch
+        # Writes since last fsync, used by the "batched" policy
+        self._unsynced = 0
+
         self.filename = filename
         self._folder = "json"
         # Gets absolute path to working directory...
         self._path = os.path.dirname(__file__) + "/" + self.folder
         # Absolute path to file (file included)
         self.full_path = self.path + "/" + self._filename
+        # Journal lives next to the json file, hotel.json -> hotel.journal
+        stem = self.full_path[:-len(self.EXTENSION)]
+        self.journal_path = stem + ".journal"
+        # Last known good copy, hotel.json uses the original backup.json
+        if self._filename == "hotel.json":
+            self.backup_path = self.path + "/backup.json"
+        else:
+            self.backup_path = stem + "_backup" + self.EXTENSION
         # Create self.folder in the current working directory.
         if not os.path.exists(self._path):
             # Make a folder called json in directory if not existing
             os.makedirs(self._path, exist_ok=True)
 
-        # Creates the .json file if it doesn't exist.
-        if not os.path.exists(self.full_path):
+        # Creates the .json file if it doesn't exist (and can't be restored from the backup).
+        if not os.path.exists(self.full_path) and not os.path.exists(
+                self.backup_path):
             self.__create_file(self.full_path)
 
     @property
@@ -70,13 +205,13 @@ class JsonHandling:
     def filename(self, value: str):
         """Setter for filename"""
         # Instead of raising an exception on no 'filename' a fallback exists.
-        self.__fallback = "hotel.json"
+        self.__fallback = "hotel" + self.EXTENSION
         # Evaluate whatever the custom value(if given is a valid file)
         if value:
-            if value.endswith(".json"):
+            if value.endswith(self.EXTENSION):
                 self._filename = value
             else:
-                self._filename = value + ".json"
+                self._filename = value + self.EXTENSION
         else:
             self._filename = self.__fallback
 
@@ -89,10 +224,82 @@ class JsonHandling:
         """
         # Loads an empty dict into the json file, or it will crash on read.
         # See testing.py in 'test' folder for more details.
-        with open(str(path), "w") as f:
-            json.dump({}, f)
+        self._atomic_write(str(path), self._encode({}))
+
+    def _encode(self, json_data: dict) -> str | bytes:
+        """
+        Converts the data to the content of the file.
+
+        Args:
+            json_data (dict): Data to be stored
+
+        Returns:
+            str | bytes: Content of the file
+        """
+        # Collections given as mappings are converted to dicts
+        return json.dumps(json_data, default=dict)
+
+    def _decode(self, content: bytes) -> dict:
+        """
+        Converts the content of the file back to data, raises ValueError if it is corrupt.
+
+        Args:
+            content (bytes): Content of the file
+
+        Returns:
+            dict: Stored data
+        """
+        return json.loads(content)
+
+    def _sync(self, f) -> bool:
+        """
+        Forces the written content of an open file to disk according to the fsync policy.
+
+        Args:
+            f (TextIO): File opened for writing
+
+        Returns:
+            bool: True if the file was forced to disk
+        """
+        if self.fsync == "never":
+            return False
+        self._unsynced += 1
+        if self.fsync == "always" or self._unsynced >= self.fsync_batch:
+            f.flush()
+            os.fsync(f.fileno())
+            self._unsynced = 0
+            return True
+        return False
+
+    def _atomic_write(self,
+                      path: str,
+                      content: str | bytes,
+                      backup_path: str = ""):
+        """
+        Writes content to a temporary file and renames it over path.
+        A crash will leave either the old or the new file, never a truncated one.
 
-    def pack_data(self, json_data: dict, mode: str = "w"):
+        Args:
+            path (str): Path of file to (over)write
+            content (str | bytes): Content of the file
+            backup_path (str, optional): Keep the replaced file here. Defaults to "".
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+            synced = self._sync(f)
+        if backup_path and os.path.exists(path):
+            # A crash before the next rename leaves no data file, unpack_data then uses the backup
+            os.replace(path, backup_path)
+        os.replace(temp_path, path)
+        # The rename is only durable once the directory is on disk too
+        if synced:
+            _fsync_directory(os.path.dirname(path) or ".")
+
+    def pack_data(self,
+                  json_data: dict,
+                  mode: str = "w",
+                  dirty: dict | None = None):
         """
         Writes json data to a json file
 
@@ -100,617 +307,4243 @@ class JsonHandling:
             json_data (dict): data to be stored in json file,
                         #! NOTE that all keys must be of type str
             mode (str, optional): Mode the file will be open in. Defaults to "w".
+            dirty (dict | None, optional): Unused, the whole file is always written. Defaults to None.
         """
-        with open(self.full_path, mode) as f:
-            json.dump(json_data, f)
+        if mode == "w":
+            self._atomic_write(self.full_path, self._encode(json_data),
+                               self.backup_path)
+        else:
+            with open(self.full_path, mode) as f:
+                json.dump(json_data, f, default=dict)
+                self._sync(f)
 
     def unpack_data(self) -> dict:
         """
-        Opens json file and returns the data structure as a dictionary
+        Opens json file and returns the data structure as a dictionary.
+        If the file is missing or corrupt it is restored from the backup file
+        (the content before the last write).
 
         Returns:
             dict: data stored in json file as a dictionary.
         """
-        with open(self.full_path) as f:
-            return json.load(f)
+        try:
+            with open(self.full_path, "rb") as f:
+                content = f.read()
+            json_data = self._decode(content)
+        except (OSError, ValueError):
+            # Raises if there is no usable backup either, nothing to recover from
+            with open(self.backup_path, "rb") as f:
+                content = f.read()
+            json_data = self._decode(content)
+            self._atomic_write(self.full_path, content)
+        return json_data
+
+    def append_journal(self, records: list[dict]):
+        """
+        Appends records to the journal file, one json object per line.
 
+        Args:
+            records (list[dict]): Records to append, (see HotelManager._log)
+        """
+        # One write for all records, the journal is never rewritten only appended to.
+        created = not os.path.exists(self.journal_path)
+        with open(self.journal_path, "a") as f:
+            f.write("".join(
+                json.dumps(record, default=_journal_default) + "\n"
+                for record in records))
+            synced = self._sync(f)
+        if created and synced:
+            # A new journal file is only found after a crash once its directory entry is on disk
+            _fsync_directory(os.path.dirname(self.journal_path) or ".")
+
+    def read_journal(self) -> list[dict]:
+        """
+        Reads all records from the journal file.
 
-class HotelManager:
+        Returns:
+            list[dict]: Records in the order they were appended, empty if no journal exists.
+        """
+        records: list[dict] = []
+        if not os.path.exists(self.journal_path):
+            return records
+
+        with open(self.journal_path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash during append can leave a half written last line, it was never committed.
+                    break
+        return records
+
+    def clear_journal(self):
+        """
+        Empties the journal file, called after a snapshot has been written.
+        """
+        open(self.journal_path, "w").close()
+
+
+class BinaryHandling(JsonHandling):
+    """
+    Class for storing the hotel as a binary snapshot, much faster to load and write than json.
+    The file is a versioned header followed by the marshal serialized data,
+    json remains the format for import and export (see migrate_storage).
     """
-    Class for managing a hotel database system.
-    Used to manipulate json data from given file that class JsonHandling returns
-    when unpacking.
 
-    HotelManager uses methods for: checking in, checking out,
-    adding bookings, removing bookings, editing bookings, adding rooms,
-    removing rooms, editing rooms, register users, unregister users and printing raw json_data.
+    EXTENSION = ".snap"
+    MAGIC = b"HTLS"
+    VERSION = 1
+    # Magic, format version and crc32 of the payload
+    HEADER = struct.Struct("<4sHI")
+
+    def _encode(self, json_data: dict) -> bytes:
+        # marshal only handles plain dicts
+        payload = marshal.dumps({
+            key: dict(value) if isinstance(value, Mapping)
+            and not isinstance(value, dict) else value
+            for key, value in json_data.items()
+        })
+        return self.HEADER.pack(self.MAGIC, self.VERSION,
+                                zlib.crc32(payload)) + payload
+
+    def _decode(self, content: bytes) -> dict:
+        if len(content) < self.HEADER.size:
+            raise ValueError("Snapshot is truncated")
+        magic, version, checksum = self.HEADER.unpack_from(content)
+        if magic != self.MAGIC:
+            raise ValueError("Not a hotel snapshot")
+        if version != self.VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+        payload = content[self.HEADER.size:]
+        if zlib.crc32(payload) != checksum:
+            raise ValueError("Snapshot checksum mismatch")
+        return marshal.loads(payload)
+
+
+class ShardedJsonHandling(JsonHandling):
     """
+    Class for handling a hotel split into one json file per collection,
+    so only the files of changed collections are rewritten.
+    "old" can further be split by the first digits of the SSN.
+
+    Layout: hotel.json (everything but the collections, the journal sequence number),
+    hotel/users.json, hotel/rooms.json, hotel/active.json and hotel/old.json or hotel/old/<prefix>.json
+
+    Every file is replaced atomically, but a write touching several files is not.
+    The main file is written last, so in journal mode a crash before it keeps the old
+    sequence number and the journal is replayed over the collections. Without the journal
+    a crash in between can leave the files of one change inconsistent, for example a
+    booking in active.json whose room in rooms.json is still vacant.
+    """
+
+    COLLECTIONS = ("users", "rooms", "active", "old", "reservations")
 
-    def __init__(self, filename: str = ""):
+    def __init__(self,
+                 filename: str = "hotel.json",
+                 fsync: str = "always",
+                 fsync_batch: int = 10,
+                 old_prefix: int = 0):
         """
-        Constructor for HotelManager
+        Constructor for ShardedJsonHandling
 
         Args:
-            filename (str, optional): Optional argument for the name of the file. Defaults to "".
+            filename (str, optional): Name of the main file. Defaults to hotel.json.
+            fsync (str, optional): fsync policy, see JsonHandling. Defaults to "always".
+            fsync_batch (int, optional): Writes per fsync with the "batched" policy. Defaults to 10.
+            old_prefix (int, optional): Split "old" by this many leading SSN digits,
+                                    0 keeps it in one file. Defaults to 0.
         """
-        # Unpacking and loading json_data from given path(Default is None)
-        self.json_handler: JsonHandling = JsonHandling(filename)
-        self.json_data = self.json_handler.unpack_data()
+        super().__init__(filename, fsync, fsync_batch)
+        self.old_prefix = old_prefix
+        # hotel.json -> hotel/
+        self.shard_path = self.full_path[:-len(".json")]
+        os.makedirs(self.shard_path + "/old", exist_ok=True)
+        # SSN prefix -> SSNs in that file, to rewrite a single old file without scanning all of "old"
+        self._old_shards: dict[str, set[str]] = {}
+        # Set when the loaded files are not in the current layout, next write rewrites everything
+        self._relayout = False
+        # Content of the main file as last written, rewritten only when it changes
+        self._main: dict | None = None
+
+    def _collection_path(self, collection: str) -> str:
+        return self.shard_path + "/" + collection + ".json"
+
+    def _old_path(self, prefix: str) -> str:
+        return self.shard_path + "/old/" + prefix + ".json"
+
+    def pack_data(self,
+                  json_data: dict,
+                  mode: str = "w",
+                  dirty: dict | None = None):
+        """
+        Writes the collections that have changed to their own files.
 
-        # Extracting or creating required structures
-        self.users = (self.json_data["users"]
-                      if "users" in self.json_data else dict())
-        self.rooms = (self.json_data["rooms"]
-                      if "rooms" in self.json_data else list())
-        # All 'active' bookings are stored in active
-        self.active = (self.json_data["active"]
-                       if "active" in self.json_data else dict())
-        self.old = self.json_data["old"] if "old" in self.json_data else dict()
+        Args:
+            json_data (dict): All collections, same layout as the json file
+            mode (str, optional): Unused, files are always replaced. Defaults to "w".
+            dirty (dict | None, optional): Collection -> changed keys (None for all keys).
+                                    None rewrites every file. Defaults to None.
+        """
+        if self._relayout:
+            dirty = None
+            self._relayout = False
+
+        for collection in self.COLLECTIONS:
+            if dirty is not None and collection not in dirty:
+                continue
+            data = json_data.get(collection, dict())
+            if collection == "old" and self.old_prefix:
+                self._pack_old(data, None if dirty is None else dirty["old"])
+            else:
+                self._atomic_write(self._collection_path(collection),
+                                   json.dumps(data, default=dict))
+
+        if dirty is None:
+            # Remove files left from the other "old" layout
+            if self.old_prefix and os.path.exists(
+                    self._collection_path("old")):
+                os.remove(self._collection_path("old"))
+            elif not self.old_prefix:
+                for file in os.listdir(self.shard_path + "/old"):
+                    os.remove(self.shard_path + "/old/" + file)
+
+        # Main file only holds what is not a collection (next room id, journal sequence number).
+        # Written last, the sequence number must not be ahead of the collections
+        main = {
+            key: value
+            for key, value in json_data.items()
+            if key not in self.COLLECTIONS
+        }
+        if dirty is None or main != self._main:
+            super().pack_data(main)
+            self._main = main
 
-        # Updates the file incase one of the values wasn't in the file
-        self._update_json()
+    def _pack_old(self, old: dict, keys: set[str] | None):
+        """
+        Rewrites the "old" files containing any of the given SSNs.
 
-        # Type hinting for pylance, only noticeable in IDE with basic or strict type checking... Ignore
-        self.json_data: dict[str, Any]
-        self.users: dict[str, dict[str, str]]
-        self.rooms: list[dict[str, str | list[str]]]
-        self.active: dict[str, dict[str, str | bool]]
-        self.old: dict[str, dict[str, str]]
+        Args:
+            old (dict): The whole "old" collection
+            keys (set[str] | None): Changed SSNs, None rewrites every file
+        """
+        if keys is None:
+            self._old_shards = {}
+            for ssn in old:
+                self._old_shards.setdefault(ssn[:self.old_prefix],
+                                            set()).add(ssn)
+            prefixes = set(self._old_shards)
+            # Files of prefixes without any SSN left
+            for file in os.listdir(self.shard_path + "/old"):
+                if file[:-len(".json")] not in prefixes:
+                    os.remove(self.shard_path + "/old/" + file)
+        else:
+            prefixes = set()
+            for ssn in keys:
+                prefix = ssn[:self.old_prefix]
+                prefixes.add(prefix)
+                shard = self._old_shards.setdefault(prefix, set())
+                if ssn in old:
+                    shard.add(ssn)
+                else:
+                    shard.discard(ssn)
 
-    def __str__(self):
+        for prefix in prefixes:
+            if shard := self._old_shards.get(prefix):
+                self._atomic_write(self._old_path(prefix),
+                                   json.dumps({ssn: old[ssn]
+                                               for ssn in shard}))
+            else:
+                self._old_shards.pop(prefix, None)
+                if os.path.exists(self._old_path(prefix)):
+                    os.remove(self._old_path(prefix))
+
+    def unpack_data(self) -> dict:
         """
-        Returns a string representation of the class HotelManager.
-        Will ultimately return a string of amount of bookings, total room and vacant rooms.
+        Loads the main file and every collection file.
+
+        Returns:
+            dict: Collections in the same layout as the json file
         """
-        # Filter dict to get only vacant rooms
-        vacant_room = self.filter_dict(self.rooms, {"state": "vacant"})
-        return f"Total bookings: {len(self.active)}\nTotal rooms: {len(self.rooms)}\nVacant rooms: {len(vacant_room)if vacant_room is not None else 0 } \nRegistered users: {len(self.users)}"
+        json_data = super().unpack_data()
+        # A single file hotel being opened sharded for the first time
+        self._relayout = any(key in json_data for key in self.COLLECTIONS)
+        self._main = {
+            key: value
+            for key, value in json_data.items()
+            if key not in self.COLLECTIONS
+        }
+
+        for collection in self.COLLECTIONS:
+            if os.path.exists(path := self._collection_path(collection)):
+                with open(path) as f:
+                    json_data[collection] = json.load(f)
+                # old.json while the old files should be split by prefix
+                self._relayout |= collection == "old" and bool(self.old_prefix)
+
+        old_files = os.listdir(self.shard_path + "/old")
+        if old_files:
+            self._relayout |= not self.old_prefix
+            old = json_data.setdefault("old", dict())
+            for file in old_files:
+                with open(self.shard_path + "/old/" + file) as f:
+                    shard = json.load(f)
+                old.update(shard)
+                self._old_shards[file[:-len(".json")]] = set(shard)
+        return json_data
+
+
+class SqliteHandling(StorageInterface):
+    """
+    Class for storing the hotel in a sqlite database.
+    Every collection is a table, so only changed rows are written.
+    """
 
-    def register_user(self, ssn: str, name: str, age: str) -> str | bool:
+    # fsync policy (see JsonHandling) -> sqlite synchronous setting
+    SYNCHRONOUS = {"always": "FULL", "batched": "NORMAL", "never": "OFF"}
+
+    def __init__(self, filename: str = "hotel.db", fsync: str = "always"):
         """
-        Registers a user to the HotelManager.
-        Will return a string or boolean depending on success.
-        (Type check for the str or bool)
+        Constructor for SqliteHandling
 
         Args:
-            ssn (str): string of 12 characters representing a user's social security number
-            name (str): name of given user
-            age (str): age of given user
-
-        Returns:
-            str | bool: str on failure, boolean(True) on success
+            filename (str, optional): Name of the database file. Defaults to hotel.db.
+            fsync (str, optional): "always", "batched" or "never". Defaults to "always".
         """
-        # Check if a user is already registered
-        if self.is_registered(ssn):
-            return "User with given ssn already exists"
+        if fsync not in self.SYNCHRONOUS:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        if not filename.endswith(".db"):
+            filename += ".db"
+        self.filename = filename
+        # Same folder as the json files
+        self.path = os.path.dirname(__file__) + "/json"
+        self.full_path = self.path + "/" + self.filename
+        os.makedirs(self.path, exist_ok=True)
+
+        # HotelManager serializes all access, but may flush from its timer thread
+        self.connection = sqlite3.connect(self.full_path,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            f"PRAGMA synchronous={self.SYNCHRONOUS[fsync]}")
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS users (
+                    ssn TEXT PRIMARY KEY, name TEXT, age TEXT);
+                CREATE TABLE IF NOT EXISTS rooms (
+                    id INTEGER PRIMARY KEY, name TEXT, price TEXT,
+                    capacity TEXT, state TEXT, description TEXT,
+                    misc TEXT, user TEXT, message TEXT);
+                CREATE INDEX IF NOT EXISTS rooms_state ON rooms (state);
+                CREATE TABLE IF NOT EXISTS active (
+                    ssn TEXT PRIMARY KEY, room TEXT, checked_in INTEGER);
+                CREATE TABLE IF NOT EXISTS old (
+                    ssn TEXT PRIMARY KEY, name TEXT, age TEXT,
+                    total_registrations TEXT);
+                CREATE TABLE IF NOT EXISTS reservations (
+                    id INTEGER PRIMARY KEY, ssn TEXT, room TEXT,
+                    arrival TEXT, departure TEXT, message TEXT);
+                CREATE INDEX IF NOT EXISTS reservations_room
+                    ON reservations (room);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY, value TEXT);
+                """)
 
-        # Check if age is a number
-        if not age.isdigit():
-            return "Age must be a number"
-        # Else add user to self.users with ssn as the key
-        self.users[ssn] = {"name": name, "age": age}
-        self._update_json()
-        return True
+    @staticmethod
+    def _user_row(ssn: str, user: dict) -> tuple:
+        return (ssn, user["name"], user["age"])
 
-    def been_registered(self, ssn: str) -> bool:
+    @staticmethod
+    def _room_row(room_id: str, room: dict) -> tuple:
+        # misc is the only list, stored as json text
+        return (int(room_id), room["name"], room["price"], room["capacity"],
+                room["state"], room["description"], json.dumps(room["misc"]),
+                room["user"], room["message"])
+
+    @staticmethod
+    def _active_row(ssn: str, booking: dict) -> tuple:
+        return (ssn, booking["room"], int(booking["checked_in"]))
+
+    @staticmethod
+    def _old_row(ssn: str, old: dict) -> tuple:
+        return (ssn, old["name"], old["age"], old["total registrations"])
+
+    @staticmethod
+    def _reservation_row(reservation_id: str, reservation: dict) -> tuple:
+        return (int(reservation_id), reservation["ssn"], reservation["room"],
+                reservation["arrival"], reservation["departure"],
+                reservation["message"])
+
+    def pack_data(self, json_data: dict, dirty: dict | None = None):
         """
-        Checks if a user has been registered.
+        Writes changed rows to the database in one transaction.
 
         Args:
-            ssn (str): string of 12 characters representing a user's social security number
+            json_data (dict): All collections, same layout as the json file
+            dirty (dict | None, optional): Collection -> changed keys (None for all keys).
+                                    None rewrites every table. Defaults to None.
+        """
+        rooms = json_data.get("rooms", {})
+        if isinstance(rooms, list):
+            # Rooms of an old json file are numbered from 1 in the order of the list
+            rooms = {str(index + 1): room for index, room in enumerate(rooms)}
+        # Table -> (rows, row converter, key column, amount of columns)
+        collections = {
+            "users": (json_data.get("users", {}), self._user_row, "ssn", 3),
+            "rooms": (rooms, self._room_row, "id", 9),
+            "active":
+            (json_data.get("active", {}), self._active_row, "ssn", 3),
+            "old": (json_data.get("old", {}), self._old_row, "ssn", 4),
+            "reservations": (json_data.get("reservations", {}),
+                             self._reservation_row, "id", 6),
+        }
+
+        with self.connection:
+            # Everything that is not a collection, next room id for example
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                ((key, json.dumps(value)) for key, value in json_data.items()
+                 if key not in collections))
+            for table, (data, to_row, key_column,
+                        columns) in collections.items():
+                if dirty is not None and table not in dirty:
+                    continue
+                keys = None if dirty is None else dirty[table]
+                # Only the fixed table/column names are formatted into the sql, never values
+                placeholders = ", ".join("?" * columns)
+                if keys is None:
+                    self.connection.execute(f"DELETE FROM {table}")
+                    if data:
+                        self.connection.executemany(
+                            f"INSERT INTO {table} VALUES ({placeholders})",
+                            (to_row(key, value) for key, value in data.items()))
+                    continue
+
+                for key in keys:
+                    if key in data:
+                        self.connection.execute(
+                            f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})",
+                            to_row(key, data[key]))
+                    else:
+                        self.connection.execute(
+                            f"DELETE FROM {table} WHERE {key_column} = ?",
+                            (int(key) if key_column == "id" else key, ))
+
+    def unpack_data(self) -> dict:
+        """
+        Loads all tables into the same layout as the json file.
 
         Returns:
-            bool: True if user is registered, False if not
+            dict: Collections in the same layout as the json file
         """
-        return ssn in self.old
+        execute = self.connection.execute
+        return {
+            **{
+                key: json.loads(value)
+                for key, value in execute("SELECT * FROM meta")
+            },
+            "users": {
+                ssn: {"name": name, "age": age}
+                for ssn, name, age in execute("SELECT * FROM users")
+            },
+            "rooms": {
+                str(room_id): {
+                    "name": name,
+                    "price": price,
+                    "capacity": capacity,
+                    "state": state,
+                    "description": description,
+                    "misc": json.loads(misc),
+                    "user": user,
+                    "message": message,
+                }
+                for room_id, name, price, capacity, state, description, misc,
+                user, message in execute("SELECT * FROM rooms ORDER BY id")
+            },
+            "active": {
+                ssn: {"room": room, "checked_in": bool(checked_in)}
+                for ssn, room, checked_in in execute("SELECT * FROM active")
+            },
+            "old": {
+                ssn: {
+                    "name": name,
+                    "age": age,
+                    "total registrations": total
+                }
+                for ssn, name, age, total in execute("SELECT * FROM old")
+            },
+            "reservations": {
+                str(reservation_id): {
+                    "ssn": ssn,
+                    "room": room,
+                    "arrival": arrival,
+                    "departure": departure,
+                    "message": message,
+                }
+                for reservation_id, ssn, room, arrival, departure, message in
+                execute("SELECT * FROM reservations ORDER BY id")
+            },
+        }
 
-    def is_registered(self, ssn: str) -> bool:
+    def close(self):
+        """Closes the database connection"""
+        self.connection.close()
+
+
+class ColdArchive(MutableMapping):
+    """
+    Compressed, lazily loaded storage for the "old" guest history.
+    Used by HotelManager in place of the "old" dict, so it is used like a dict.
+
+    Entries are grouped into buckets by the first digits of the SSN. Every bucket is
+    stored zlib compressed in a data file and found through a small index file,
+    only buckets that are actually accessed are read from disk.
+    """
+
+    def __init__(self,
+                 filename: str = "hotel",
+                 bucket_digits: int = 6,
+                 max_buckets: int = 256,
+                 fsync: bool = True,
+                 load: Callable[[dict], Any] | None = None,
+                 dump: Callable[[Any], dict] | None = None):
         """
-        Returns a boolean depending on whether a user is registered or not.
+        Constructor for ColdArchive
 
         Args:
-            ssn (str): SSN of user
-
-        Returns:
-            bool: True if a user is registered, False otherwise
+            filename (str, optional): Name of the hotel, the archive is stored as
+                                    <name>_old.idx and <name>_old.<n>.dat. Defaults to "hotel".
+            bucket_digits (int, optional): Leading SSN digits per bucket, 6 is one bucket
+                                    per birth month. Defaults to 6.
+            max_buckets (int, optional): Unchanged buckets kept in memory before the
+                                    oldest are dropped. Defaults to 256.
+            fsync (bool, optional): Force writes to disk. Defaults to True.
+            load (Callable | None, optional): Converts a stored entry when a bucket is read.
+                                    Defaults to None (entries as stored).
+            dump (Callable | None, optional): Converts an entry to its stored form when a
+                                    bucket is written. Defaults to None (entries as they are).
         """
-        return ssn in self.users
+        if filename.endswith(".json"):
+            filename = filename[:-len(".json")]
+        # Same folder as the json files
+        self.path = os.path.dirname(__file__) + "/json"
+        os.makedirs(self.path, exist_ok=True)
+        self._name = filename + "_old"
+        self.index_path = self.path + "/" + self._name + ".idx"
+        self.bucket_digits = bucket_digits
+        self.max_buckets = max_buckets
+        self.fsync = fsync
+        self.load = load
+        self.dump = dump
+
+        # Index is loaded on first access: {"snapshot", "data", "buckets": {prefix: [offset, length, count]}}
+        self._index_data: dict | None = None
+        # Buckets read from disk (or created) so far, prefix -> {ssn: entry}
+        self._buckets: dict[str, dict] = {}
+        # Prefixes of buckets changed since last prepare()
+        self._dirty: set[str] = set()
 
-    def is_ssn_valid(self, ssn: str) -> bool:
-        """Evaluate if ssn is valid
+    @property
+    def _index(self) -> dict:
+        """Property for the index, read from disk on first use"""
+        if self._index_data is None:
+            if os.path.exists(self.index_path):
+                with open(self.index_path) as f:
+                    self._index_data = json.load(f)
+            else:
+                self._index_data = {
+                    "snapshot": 0,
+                    "data": self._name + ".0.dat",
+                    "buckets": {}
+                }
+        return self._index_data
+
+    def _read_bucket(self, prefix: str) -> dict:
+        """
+        Reads and decompresses a bucket from the data file, without caching it.
 
         Args:
-            ssn (str): Social security number.
+            prefix (str): Bucket prefix
 
         Returns:
-            bool: True on success, False otherwise
+            dict: ssn -> entry, empty if the bucket is not stored
         """
-        # Removes all dashes and spaces
-        ssn = ssn.replace("-", "").replace(" ", "")
-        if ssn.isdigit():
-            if len(ssn) == 12:
-                return True
-        return False
-
-    def edit_user(self,
-                  ssn: str,
-                  name: str = "",
-                  age: str = "",
-                  new_ssn: str = "") -> bool:
+        if prefix not in self._index["buckets"]:
+            return dict()
+        offset, length, _ = self._index["buckets"][prefix]
+        with open(self.path + "/" + self._index["data"], "rb") as f:
+            f.seek(offset)
+            bucket = json.loads(zlib.decompress(f.read(length)))
+        if self.load is not None:
+            bucket = {ssn: self.load(entry) for ssn, entry in bucket.items()}
+        return bucket
+
+    def _bucket(self, ssn: str) -> dict:
         """
-        Edits a user's information.
+        Returns the (cached) bucket an ssn belongs to.
 
         Args:
-            ssn (str): SSN of the CURRENTLY registered user, provide new_ssn to edit this
-            name (str, optional): New name. Defaults to "".
-            age (str, optional): New age. Defaults to "".
-            new_ssn (str, optional): New ssn. Defaults to "".
+            ssn (str): SSN of the guest
 
         Returns:
-            bool: True on success, False otherwise
+            dict: ssn -> entry
+        """
+        prefix = ssn[:self.bucket_digits]
+        if prefix not in self._buckets:
+            self._buckets[prefix] = self._read_bucket(prefix)
+            self._evict(keep=prefix)
+        return self._buckets[prefix]
+
+    def _evict(self, keep: str = ""):
         """
-        if not self.is_ssn_valid(ssn):
+        Drops the oldest unchanged buckets while more than max_buckets are in memory,
+        they are read from disk again when needed.
+
+        Args:
+            keep (str, optional): Prefix of a bucket that is never dropped. Defaults to "".
+        """
+        excess = len(self._buckets) - self.max_buckets
+        if excess <= 0:
+            return
+        clean = [
+            prefix for prefix in self._buckets
+            if prefix not in self._dirty and prefix != keep
+        ]
+        for prefix in clean[:excess]:
+            del self._buckets[prefix]
+
+    def __getitem__(self, ssn: str) -> dict:
+        return self._bucket(ssn)[ssn]
+
+    def __setitem__(self, ssn: str, entry: dict):
+        self._bucket(ssn)[ssn] = entry
+        self._dirty.add(ssn[:self.bucket_digits])
+
+    def __delitem__(self, ssn: str):
+        del self._bucket(ssn)[ssn]
+        self._dirty.add(ssn[:self.bucket_digits])
+
+    def __contains__(self, ssn: object) -> bool:
+        if not isinstance(ssn, str):
             return False
+        # Lookups don't keep the bucket in memory
+        prefix = ssn[:self.bucket_digits]
+        if prefix in self._buckets:
+            return ssn in self._buckets[prefix]
+        return ssn in self._read_bucket(prefix)
+
+    def __iter__(self):
+        # Buckets not already in memory are read one at a time and not kept
+        for prefix in sorted(set(self._index["buckets"]) | set(self._buckets)):
+            if prefix in self._buckets:
+                yield from list(self._buckets[prefix])
+            else:
+                yield from self._read_bucket(prefix)
 
-        if self.is_registered(ssn):
-            # If new ssn is provided, the key must be updated.
-            if new_ssn:
-                # Changes key in self.users to new_ssn(pop returns the value hence the assignment below)
-                self.users[new_ssn] = self.users.pop(ssn)
-                # Edit booking ssn
-                if self.is_booked(ssn):
-                    self.active[new_ssn] = self.active.pop(ssn)
-                    booked_room_index = int(self.active[new_ssn]["room"]) - 1
-                    self.rooms[booked_room_index]["user"] = new_ssn
+    def iter_items(self):
+        """
+        Iterates over all entries one bucket at a time, without keeping
+        buckets in memory that weren't already.
 
-                # Edit old ssn
-                if ssn in self.old:
-                    self.old[new_ssn] = self.old.pop(ssn)
-                # To not interfere with multiple changes
-                ssn = new_ssn
-            if name:
-                self.users[ssn]["name"] = name
-            if age:
-                self.users[ssn]["age"] = age
-            self._update_json()
-            return True
-        # User is not registered
-        return False
+        Yields:
+            tuple[str, dict]: ssn and entry
+        """
+        for prefix in sorted(set(self._index["buckets"]) | set(self._buckets)):
+            if prefix in self._buckets:
+                yield from list(self._buckets[prefix].items())
+            else:
+                yield from self._read_bucket(prefix).items()
 
-    def unregister_user(self, ssn: str) -> bool | str:
+    def __len__(self) -> int:
+        # Counts of buckets not in memory are stored in the index
+        return sum(
+            count for prefix, (_, _, count) in self._index["buckets"].items()
+            if prefix not in self._buckets) + sum(
+                len(bucket) for bucket in self._buckets.values())
+
+    def mark_dirty(self, ssn: str | None = None):
         """
-        Unregister a user from the HotelManager.
-        Will return a string or boolean depending on success.
+        Marks the bucket of an ssn as changed, needed when an entry is changed in place.
 
         Args:
-            ssn (str): string of 12 characters representing a user's social security number
+            ssn (str | None, optional): SSN of the changed entry, None marks every
+                                    bucket in memory. Defaults to None.
+        """
+        if ssn is None:
+            self._dirty.update(self._buckets)
+        else:
+            # Loaded first, a changed bucket that isn't in memory would be written as empty
+            self._bucket(ssn)
+            self._dirty.add(ssn[:self.bucket_digits])
 
-        Returns:
-            str | bool: str on failure, boolean(True) on success
+    def prepare(self, snapshot: int) -> bool:
         """
-        if not self.is_ssn_valid(ssn):
-            return "Invalid ssn"
+        First step of writing the archive. Appends changed buckets to the data file
+        and writes a pending index, which commit() makes the current one.
 
-        # Check if a user is already registered
-        if not self.is_registered(ssn):
-            return "User with given ssn does not exist"
+        Args:
+            snapshot (int): Number of the snapshot being written with the archive,
+                            must be higher than the one of the last snapshot
 
-        if self.is_booked(ssn):
-            # Removes current booking, but does not unregister the user(yet)
-            self.remove_booking(ssn, False)
-        # Total registration count
-        if ssn not in self.old:
-            self.old[ssn] = {}
+        Returns:
+            bool: True if anything was written and commit() should be called
+        """
+        if not self._dirty:
+            return False
 
-        self.old[ssn]["name"] = self.users[ssn]["name"]
-        self.old[ssn]["age"] = self.users[ssn]["age"]
+        buckets = self._index["buckets"]
+        data_path = self.path + "/" + self._index["data"]
+        # Buckets are never overwritten, a changed bucket is appended and the index moved to it
+        with open(data_path, "ab") as f:
+            for prefix in self._dirty:
+                bucket = self._buckets.get(prefix)
+                if bucket:
+                    if self.dump is not None:
+                        bucket = {
+                            ssn: self.dump(entry)
+                            for ssn, entry in bucket.items()
+                        }
+                    compressed = zlib.compress(json.dumps(bucket).encode())
+                    buckets[prefix] = [f.tell(), len(compressed), len(bucket)]
+                    f.write(compressed)
+                else:
+                    buckets.pop(prefix, None)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._dirty = set()
+        self._index["snapshot"] = snapshot
+        self._evict()
+
+        # Rewrite into a new data file when most of it is replaced buckets
+        live_size = sum(length for _, length, _ in buckets.values())
+        if os.path.getsize(data_path) > 2 * live_size + 2**20:
+            self._compact()
+
+        with open(self.index_path + ".new", "w") as f:
+            json.dump(self._index, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return True
+
+    def _compact(self):
+        """
+        Copies all live buckets (still compressed) into a new data file.
+        The old data file is removed on commit(), the current index still points to it.
+        """
+        old_data = self._index["data"]
+        generation = int(old_data.split(".")[-2]) + 1
+        new_data = f"{self._name}.{generation}.dat"
+        with open(self.path + "/" + old_data, "rb") as source, \
+                open(self.path + "/" + new_data, "wb") as target:
+            for bucket in self._index["buckets"].values():
+                source.seek(bucket[0])
+                compressed = source.read(bucket[1])
+                bucket[0] = target.tell()
+                target.write(compressed)
+            target.flush()
+            if self.fsync:
+                os.fsync(target.fileno())
+        self._index["data"] = new_data
+
+    def commit(self):
+        """
+        Second step of writing the archive, makes the pending index the current one.
+        """
+        os.replace(self.index_path + ".new", self.index_path)
+        if self.fsync:
+            _fsync_directory(self.path)
+        # Data files of earlier generations are no longer referenced
+        for file in os.listdir(self.path):
+            if (file.startswith(self._name + ".") and file.endswith(".dat")
+                    and file != self._index["data"]):
+                os.remove(self.path + "/" + file)
+
+    def recover(self, snapshot: int):
+        """
+        Finishes or discards a pending index left by a crash between prepare() and commit().
 
-        if "total registrations" in self.old[ssn]:
-            total_reg = int(self.old[ssn]["total registrations"])
+        Args:
+            snapshot (int): Number of the loaded snapshot
+        """
+        if not os.path.exists(self.index_path + ".new"):
+            return
+        with open(self.index_path + ".new") as f:
+            pending_snapshot = json.load(f).get("snapshot")
+        if pending_snapshot == snapshot:
+            # The snapshot written together with the index made it to disk
+            self._index_data = None
+            self.commit()
         else:
-            total_reg = 0
+            os.remove(self.index_path + ".new")
+
+
+def migrate_storage(source: StorageInterface, target: StorageInterface):
+    """
+    Copies a whole hotel from one storage backend to another, for example
+    migrate_storage(JsonHandling("hotel.json"), SqliteHandling("hotel.db"))
+
+    Args:
+        source (StorageInterface): Backend to read from
+        target (StorageInterface): Backend to write to, existing content is replaced
+    """
+    target.pack_data(source.unpack_data())
+
+
+# Marks a key that did not exist before a transaction changed it
+_MISSING = object()
+
+
+def parse_price(price: str | int) -> int:
+    """
+    Converts a price to integer cents, "19.99" -> 1999. An int is already in cents.
+
+    Args:
+        price (str | int): Price with at most two decimals or cents
+
+    Raises:
+        ValueError: Not a valid price
+
+    Returns:
+        int: Price in cents
+    """
+    if isinstance(price, int):
+        return price
+    whole, _, cents = price.strip().partition(".")
+    if (not (whole or cents) or not (whole or "0").isdigit()
+            or not (cents or "0").isdigit() or len(cents) > 2):
+        raise ValueError(f"Invalid price: {price}")
+    return int(whole or "0") * 100 + int(cents.ljust(2, "0"))
+
+
+def format_price(cents: int) -> str:
+    """
+    Converts integer cents back to a price, 1999 -> "19.99".
+
+    Args:
+        cents (int): Price in cents
+
+    Returns:
+        str: Price with two decimals
+    """
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+@functools.lru_cache(maxsize=4096)
+def canonical_ssn(ssn: str) -> str:
+    """
+    Converts an ssn to the key the hotel stores guests under, 12 digits without
+    dashes or spaces, "19900101-1234" -> "199001011234".
+    Cached, the same few ssns are looked up over and over.
+
+    Args:
+        ssn (str): Social security number, YYYYMMDDXXXX with optional dashes and spaces
+
+    Returns:
+        str: The canonical ssn, empty if it is not valid
+    """
+    ssn = ssn.replace("-", "").replace(" ", "")
+    if len(ssn) == 12 and ssn.isdigit():
+        return ssn
+    return ""
+
+
+class _Record(metaclass=ABCMeta):
+    """
+    Base of the compact records HotelManager keeps in memory (User, Room, Booking
+    and HistoryEntry). Fields are __slots__ attributes, but can also be read and written
+    like the dicts they replace: room["state"], room.get("misc") or {**room}.
+    Conversion to and from the stored (json) layout is done by from_json and to_json.
+    """
+
+    __slots__ = ()
+    # Field names in the stored layout, in order. A space is an underscore in the attribute
+    FIELDS: tuple[str, ...] = ()
+    # Parsers of the numeric fields, stored as strings but kept typed in memory
+    PARSE: dict[str, Callable[[Any], Any]] = {}
+
+    @classmethod
+    @abstractmethod
+    def from_json(cls, data: dict) -> "_Record":
+        """Creates a record from its stored layout"""
+
+    @abstractmethod
+    def to_json(self) -> dict:
+        """Returns the record in its stored layout"""
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field.replace(" ", "_"))
+
+    def __setitem__(self, field: str, value: Any):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        if field in self.PARSE:
+            value = self.PARSE[field](value)
+        setattr(self, field.replace(" ", "_"), value)
+
+    def __contains__(self, field: object) -> bool:
+        return field in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def keys(self) -> tuple[str, ...]:
+        return self.FIELDS
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return self[field] if field in self.FIELDS else default
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and all(
+            self[field] == other[field]  # type: ignore
+            for field in self.FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field.replace(' ', '_')}={self[field]!r}"
+                           for field in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class User(_Record):
+    """A registered user, self.users[ssn]"""
+
+    __slots__ = ("name", "age")
+    FIELDS = ("name", "age")
+    PARSE = {"age": int}
+
+    def __init__(self, name: str, age: int):
+        self.name = name
+        self.age = age
+
+    @classmethod
+    def from_json(cls, data: dict) -> "User":
+        return cls(data["name"], int(data["age"]))
+
+    def to_json(self) -> dict:
+        return {"name": self.name, "age": str(self.age)}
+
+
+class RoomType:
+    """
+    Name, description and misc of a room, one object shared by every room that has
+    the same three (see RoomType.get). Never changed, misc is a tuple,
+    a room that is edited gets another RoomType.
+    """
+
+    __slots__ = ("name", "description", "misc", "__weakref__")
+    # (name, description, misc) -> the shared RoomType, for as long as a room uses it
+    _shared: "weakref.WeakValueDictionary[tuple, RoomType]" = (
+        weakref.WeakValueDictionary())
+
+    def __init__(self, name: str, description: str, misc: list[str]):
+        """
+        Constructor for RoomType, use RoomType.get to share it.
+
+        Args:
+            name (str): Name of the room, example: JuniorSuite
+            description (str): A short description, who its fitted for
+            misc (list[str]): list of additional information, example: wifi
+        """
+        self.name = sys.intern(name)
+        self.description = sys.intern(description)
+        self.misc = tuple(sys.intern(item) for item in misc)
+
+    @classmethod
+    def get(cls, name: str, description: str, misc: list[str]) -> "RoomType":
+        """
+        Returns the shared RoomType of name, description and misc, created if needed.
+
+        Args:
+            name (str): Name of the room, example: JuniorSuite
+            description (str): A short description, who its fitted for
+            misc (list[str]): list of additional information, example: wifi
+
+        Returns:
+            RoomType: The shared RoomType
+        """
+        key = (name, description, tuple(misc))
+        if (room_type := cls._shared.get(key)) is None:
+            room_type = cls._shared[key] = cls(name, description, misc)
+        return room_type
+
+    def __copy__(self) -> "RoomType":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "RoomType":
+        # Never changed, copies of a room (undo log for example) share it
+        return self
+
+    def __repr__(self) -> str:
+        return (f"RoomType(name={self.name!r}, "
+                f"description={self.description!r}, misc={self.misc!r})")
+
+
+class Room(_Record):
+    """
+    A room, self.rooms[room_id]. Price is in cents.
+    Name, description and misc are kept in a RoomType shared with identical rooms.
+    """
+
+    __slots__ = ("type", "price", "capacity", "state", "user", "message")
+    FIELDS = ("name", "price", "capacity", "state", "description", "misc",
+              "user", "message")
+    PARSE = {"price": parse_price, "capacity": int}
+
+    def __init__(self,
+                 name: str,
+                 price: int,
+                 capacity: int,
+                 state: str,
+                 description: str,
+                 misc: list[str],
+                 user: str = "",
+                 message: str = ""):
+        self.type = RoomType.get(name, description, misc)
+        self.price = price
+        self.capacity = capacity
+        # Only a few states, every room refers to the same strings
+        self.state = sys.intern(state)
+        self.user = user
+        self.message = message
+
+    @property
+    def name(self) -> str:
+        return self.type.name
+
+    @name.setter
+    def name(self, name: str):
+        self.type = RoomType.get(name, self.type.description, self.type.misc)
+
+    @property
+    def description(self) -> str:
+        return self.type.description
+
+    @description.setter
+    def description(self, description: str):
+        self.type = RoomType.get(self.type.name, description, self.type.misc)
+
+    @property
+    def misc(self) -> list[str]:
+        # A copy, the shared tuple is changed by assigning a new list
+        return list(self.type.misc)
+
+    @misc.setter
+    def misc(self, misc: list[str]):
+        self.type = RoomType.get(self.type.name, self.type.description, misc)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Room":
+        return cls(data["name"], parse_price(data["price"]),
+                   int(data["capacity"]), data["state"], data["description"],
+                   data["misc"], data.get("user", ""), data.get("message", ""))
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "price": format_price(self.price),
+            "capacity": str(self.capacity),
+            "state": self.state,
+            "description": self.description,
+            "misc": self.misc,
+            "user": self.user,
+            "message": self.message,
+        }
+
+
+class Booking(_Record):
+    """An active booking, self.active[ssn]"""
+
+    __slots__ = ("room", "checked_in")
+    FIELDS = __slots__
+
+    def __init__(self, room: str, checked_in: bool = False):
+        self.room = room
+        self.checked_in = checked_in
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Booking":
+        return cls(str(data["room"]), data["checked_in"])
+
+    def to_json(self) -> dict:
+        return {"room": self.room, "checked_in": self.checked_in}
+
+
+class HistoryEntry(_Record):
+    """A user that has been registered, self.old[ssn]"""
+
+    __slots__ = ("name", "age", "total_registrations")
+    FIELDS = ("name", "age", "total registrations")
+    PARSE = {"age": int, "total registrations": int}
+
+    def __init__(self, name: str, age: int, total_registrations: int = 0):
+        self.name = name
+        self.age = age
+        self.total_registrations = total_registrations
+
+    @classmethod
+    def from_json(cls, data: dict) -> "HistoryEntry":
+        return cls(data["name"], int(data["age"]),
+                   int(data.get("total registrations", 0)))
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "age": str(self.age),
+            "total registrations": str(self.total_registrations),
+        }
+
+
+def parse_date(value: str | datetime.date) -> datetime.date:
+    """
+    Converts a date in the YYYY-MM-DD format to a date, a date is returned as is.
+
+    Args:
+        value (str | datetime.date): Date
+
+    Raises:
+        ValueError: Not a valid date
+
+    Returns:
+        datetime.date: The date
+    """
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(value)
+
+
+class Reservation(_Record):
+    """
+    A future stay in a room, self.reservations[reservation_id].
+    The guest stays the nights from arrival up to, not including, departure.
+    """
+
+    __slots__ = ("ssn", "room", "arrival", "departure", "message")
+    FIELDS = __slots__
+    PARSE = {"arrival": parse_date, "departure": parse_date}
+
+    def __init__(self,
+                 ssn: str,
+                 room: str,
+                 arrival: datetime.date,
+                 departure: datetime.date,
+                 message: str = ""):
+        self.ssn = ssn
+        self.room = room
+        self.arrival = arrival
+        self.departure = departure
+        self.message = message
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Reservation":
+        return cls(data["ssn"], str(data["room"]), parse_date(data["arrival"]),
+                   parse_date(data["departure"]), data.get("message", ""))
+
+    def to_json(self) -> dict:
+        return {
+            "ssn": self.ssn,
+            "room": self.room,
+            "arrival": self.arrival.isoformat(),
+            "departure": self.departure.isoformat(),
+            "message": self.message,
+        }
+
+
+# Record class of each collection
+RECORDS: dict[str, type[_Record]] = {
+    "users": User,
+    "rooms": Room,
+    "active": Booking,
+    "old": HistoryEntry,
+    "reservations": Reservation,
+}
+
+
+class _StorageView(Mapping):
+    """
+    Read only view of a HotelManager collection as it is stored.
+    Records are converted when read, so backends that only write changed keys
+    only convert those.
+    """
+
+    def __init__(self, data: Mapping):
+        """
+        Constructor for _StorageView
+
+        Args:
+            data (Mapping): The collection of records
+        """
+        self.data = data
+
+    def __getitem__(self, key: str) -> dict:
+        return self.data[key].to_json()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class RoomColumns:
+    """
+    Columnar copy of the rooms for analytics over many rooms in one pass,
+    kept in sync by HotelManager (HotelManager(columns=True)).
+    Every column is an array, the same row in every column is the same room.
+    Rows are not in room id order, a removed room is replaced by the last row.
+    """
+
+    def __init__(self):
+        """
+        Constructor for RoomColumns
+        """
+        self.ids: list[str] = []
+        # Price in cents
+        self.price = array("q")
+        self.capacity = array("q")
+        # Index of the state in self.states
+        self.state = array("B")
+        self.misc: list[tuple[str, ...]] = []
+        self.states: list[str] = []
+        # Room id -> row
+        self._rows: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def state_code(self, state: str) -> int:
+        """
+        Returns the code of a state in the state column, new states are added.
+
+        Args:
+            state (str): State, example: vacant
+
+        Returns:
+            int: Code of the state
+        """
+        if state not in self.states:
+            self.states.append(state)
+        return self.states.index(state)
+
+    def add(self, room_id: str, room: "Room"):
+        """
+        Appends a room as a new row.
+
+        Args:
+            room_id (str): Room id
+            room (Room): The room
+        """
+        self._rows[room_id] = len(self.ids)
+        self.ids.append(room_id)
+        self.price.append(room.price)
+        self.capacity.append(room.capacity)
+        self.state.append(self.state_code(room.state))
+        self.misc.append(room.type.misc)
+
+    def update(self, room_id: str, room: "Room"):
+        """
+        Rewrites the row of a room in place.
+
+        Args:
+            room_id (str): Room id
+            room (Room): The room
+        """
+        row = self._rows[room_id]
+        self.price[row] = room.price
+        self.capacity[row] = room.capacity
+        self.state[row] = self.state_code(room.state)
+        self.misc[row] = room.type.misc
+
+    def remove(self, room_id: str):
+        """
+        Removes the row of a room, the last row takes its place.
+
+        Args:
+            room_id (str): Room id
+        """
+        row = self._rows.pop(room_id)
+        last = len(self.ids) - 1
+        if row != last:
+            for column in (self.ids, self.price, self.capacity, self.state,
+                           self.misc):
+                column[row] = column[last]
+            self._rows[self.ids[row]] = row
+        for column in (self.ids, self.price, self.capacity, self.state,
+                       self.misc):
+            column.pop()
+
+    def _state_filter(self, state: str | None) -> int | None:
+        """Returns the code of state, -1 if no room has it and None for all states"""
+        if state is None:
+            return None
+        return self.states.index(state) if state in self.states else -1
+
+    def average_price_by_capacity(self,
+                                  state: str | None = "vacant"
+                                  ) -> dict[int, float]:
+        """
+        Average price of the rooms grouped by capacity.
+
+        Args:
+            state (str | None, optional): Only rooms in this state, None for all rooms.
+                                    Defaults to "vacant".
+
+        Returns:
+            dict[int, float]: capacity -> average price in cents, sorted by capacity
+        """
+        code = self._state_filter(state)
+        totals: dict[int, list[int]] = {}
+        for price, capacity, room_state in zip(self.price, self.capacity,
+                                               self.state):
+            if code is None or room_state == code:
+                total = totals.setdefault(capacity, [0, 0])
+                total[0] += price
+                total[1] += 1
+        return {
+            capacity: total / count
+            for capacity, (total, count) in sorted(totals.items())
+        }
+
+    def in_price_band(self,
+                      low: int,
+                      high: int,
+                      state: str | None = None) -> list[str]:
+        """
+        Ids of the rooms priced within a band.
+
+        Args:
+            low (int): Lowest price in cents, inclusive
+            high (int): Highest price in cents, inclusive
+            state (str | None, optional): Only rooms in this state, None for all rooms.
+                                    Defaults to None.
+
+        Returns:
+            list[str]: Room ids, in row order
+        """
+        code = self._state_filter(state)
+        return [
+            room_id for room_id, price, room_state in zip(
+                self.ids, self.price, self.state)
+            if low <= price <= high and (code is None or room_state == code)
+        ]
+
+    def total_price(self, state: str | None = "occupied") -> int:
+        """
+        Sum of the price per night, of the occupied rooms it is the revenue per night.
+
+        Args:
+            state (str | None, optional): Only rooms in this state, None for all rooms.
+                                    Defaults to "occupied".
+
+        Returns:
+            int: Total in cents
+        """
+        code = self._state_filter(state)
+        if code is None:
+            return sum(self.price)
+        return sum(price for price, room_state in zip(self.price, self.state)
+                   if room_state == code)
+
+
+class AmenityIndex:
+    """
+    Amenities of the rooms (their misc lists) as bitmasks, kept in sync by HotelManager.
+    Every amenity is registered once and gets a bit, a room's amenities are one int.
+    """
+
+    def __init__(self):
+        """
+        Constructor for AmenityIndex
+        """
+        # Registry, amenity -> bit and bit -> amenity. Bits are never reused
+        self.bits: dict[str, int] = {}
+        self.names: list[str] = []
+        # Room id -> mask of its amenities
+        self.masks: dict[str, int] = {}
+        # Amenity -> room ids that have it
+        self.rooms: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def register(self, amenity: str) -> int:
+        """
+        Returns the bit of an amenity, new amenities are added to the registry.
+
+        Args:
+            amenity (str): Amenity, example: wifi
+
+        Returns:
+            int: Bit of the amenity
+        """
+        if amenity not in self.bits:
+            self.bits[amenity] = 1 << len(self.names)
+            self.names.append(amenity)
+        return self.bits[amenity]
+
+    def mask(self, amenities: Collection[str]) -> int | None:
+        """
+        Returns the mask of some amenities.
+
+        Args:
+            amenities (Collection[str]): Amenities, example: ["wifi", "fridge"]
+
+        Returns:
+            int | None: Mask, None if an amenity is not registered (no room has it)
+        """
+        mask = 0
+        for amenity in amenities:
+            if amenity not in self.bits:
+                return None
+            mask |= self.bits[amenity]
+        return mask
+
+    def amenities(self, mask: int) -> list[str]:
+        """
+        Returns the amenities of a mask, in order of registration.
+
+        Args:
+            mask (int): Mask of amenities
+
+        Returns:
+            list[str]: Amenities
+        """
+        return [name for bit, name in enumerate(self.names) if mask >> bit & 1]
+
+    def add(self, room_id: str, misc: list[str]):
+        """
+        Adds the amenities of a room.
+
+        Args:
+            room_id (str): Room id
+            misc (list[str]): Amenities of the room
+        """
+        mask = 0
+        for amenity in misc:
+            mask |= self.register(amenity)
+            self.rooms.setdefault(amenity, set()).add(room_id)
+        self.masks[room_id] = mask
+
+    def remove(self, room_id: str):
+        """
+        Removes the amenities of a room.
+
+        Args:
+            room_id (str): Room id
+        """
+        for amenity in self.amenities(self.masks.pop(room_id, 0)):
+            room_ids = self.rooms[amenity]
+            room_ids.discard(room_id)
+            if not room_ids:
+                del self.rooms[amenity]
+
+    def matching(self,
+                 amenities: Collection[str],
+                 room_ids: Collection[str] | None = None) -> set[str]:
+        """
+        Returns the rooms that have all the amenities.
+        Starts from the rarest amenity and checks each of its rooms with one AND.
+
+        Args:
+            amenities (Collection[str]): Amenities, example: ["wifi", "fridge"]
+            room_ids (Collection[str] | None, optional): Only these rooms.
+                                    Defaults to None (all rooms).
+
+        Returns:
+            set[str]: Room ids
+        """
+        mask = self.mask(amenities)
+        if mask is None:
+            return set()
+        if not mask:
+            return set(self.masks if room_ids is None else room_ids)
+        candidates = min((self.rooms.get(amenity, set())
+                          for amenity in amenities),
+                         key=len)
+        if room_ids is not None:
+            if len(room_ids) < len(candidates):
+                candidates = room_ids
+            else:
+                candidates = candidates.intersection(room_ids)
+        masks = self.masks
+        return {
+            room_id
+            for room_id in candidates if masks.get(room_id, 0) & mask == mask
+        }
+
+
+# Words for the text indexes, compiled once
+_WORD = re.compile(r"\w+")
+# Parts of a word, split where the case changes or digits start or end
+_WORD_PART = re.compile(r"[A-ZÀ-ÖØ-Þ]?[a-zß-öø-ÿ]+|[A-ZÀ-ÖØ-Þ]+(?![a-zß-öø-ÿ])|\d+|[^\W\d_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase words for the text indexes. A word made of parts
+    is kept whole and split, so both "suite" and "juniorsuite" find "JuniorSuite".
+
+    Args:
+        text (str): Text, example: "JuniorSuite, 2xDoubleBed"
+
+    Returns:
+        list[str]: Words, example: ["junior", "suite", "juniorsuite", "2", "x", "double", "bed", "2xdoublebed"]
+    """
+    words = []
+    for word in _WORD.findall(text):
+        parts = _WORD_PART.findall(word)
+        if len(parts) > 1:
+            words.extend(part.lower() for part in parts)
+        words.append(word.lower())
+    return words
+
+
+class TextIndex:
+    """
+    Inverted index of words to keys (room ids or ssns) for ranked text search,
+    kept in sync by HotelManager.
+    """
+
+    def __init__(self):
+        """
+        Constructor for TextIndex
+        """
+        # Word -> key -> how many times the word is in the text of the key
+        self.postings: dict[str, dict[str, int]] = {}
+        # Key -> its words, to remove them again
+        self.documents: dict[str, tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, key: str, text: str):
+        """
+        Indexes the text of a key, replaces what was indexed for it before.
+
+        Args:
+            key (str): Room id or ssn
+            text (str): Text to index
+        """
+        self.remove(key)
+        self._add(key, tokenize(text))
+
+    def build(self, texts: Mapping[str, str]):
+        """
+        Replaces everything in the index.
+
+        Args:
+            texts (Mapping[str, str]): Key -> text to index
+        """
+        self.postings = {}
+        self.documents = {}
+        for key, text in texts.items():
+            self._add(key, tokenize(text))
+
+    def _add(self, key: str, words: list[str]):
+        """Indexes the words of a key that is not in the index"""
+        postings = self.postings
+        for word in words:
+            if (counts := postings.get(word)) is None:
+                counts = postings[word] = {}
+            counts[key] = counts.get(key, 0) + 1
+        self.documents[key] = tuple(set(words))
+
+    def remove(self, key: str):
+        """
+        Removes a key from the index.
+
+        Args:
+            key (str): Room id or ssn
+        """
+        for word in self.documents.pop(key, ()):
+            counts = self.postings[word]
+            del counts[key]
+            if not counts:
+                del self.postings[word]
+
+    def search(self,
+               text: str,
+               limit: int = 0,
+               match_all: bool = True) -> list[tuple[str, float]]:
+        """
+        Finds the keys whose text has the words of a query, best match first.
+        A key scores the sum of count * idf of the query words it has,
+        rare words weigh more. Equal scores are in key order.
+
+        Args:
+            text (str): Query, example: "double bed wifi"
+            limit (int, optional): Most keys to return, 0 for all. Defaults to 0.
+            match_all (bool, optional): Keys must have every word, otherwise any word.
+                                    Defaults to True.
+
+        Returns:
+            list[tuple[str, float]]: (key, score) pairs
+        """
+        postings = [self.postings.get(word, {}) for word in set(tokenize(text))]
+        if not postings:
+            return []
+        if match_all:
+            # Only the keys of the rarest word are candidates
+            postings.sort(key=len)
+            rest = postings[1:]
+            keys = [
+                key for key in postings[0]
+                if all(key in counts for counts in rest)
+            ]
+        else:
+            keys = set().union(*postings)
+        total = len(self.documents)
+        weights = [(counts, math.log(1 + total / len(counts)))
+                   for counts in postings if counts]
+        scored = [(-sum(counts.get(key, 0) * weight
+                        for counts, weight in weights), key) for key in keys]
+        ranked = heapq.nsmallest(limit, scored) if limit else sorted(scored)
+        return [(key, -score) for score, key in ranked]
+
+
+class PrefixIndex:
+    """
+    Sorted (word, key) pairs for prefix lookups, kept in sync by HotelManager.
+    A lookup is one bisect to the first word with the prefix, O(log n + k).
+    """
+
+    def __init__(self):
+        """
+        Constructor for PrefixIndex
+        """
+        self.entries: list[tuple[str, str]] = []
+        # Key -> its words, to remove them again
+        self.words: dict[str, tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def add(self, key: str, words: Collection[str]):
+        """
+        Indexes the words of a key, replaces what was indexed for it before.
+
+        Args:
+            key (str): Ssn
+            words (Collection[str]): Words to find the key by
+        """
+        self.remove(key)
+        self.words[key] = tuple(set(words))
+        for word in self.words[key]:
+            bisect.insort(self.entries, (word, key))
+
+    def build(self, words: Mapping[str, Collection[str]]):
+        """
+        Replaces everything in the index, sorted once instead of inserted one by one.
+
+        Args:
+            words (Mapping[str, Collection[str]]): Key -> words to find the key by
+        """
+        self.words = {key: tuple(set(item)) for key, item in words.items()}
+        self.entries = sorted(
+            (word, key) for key, item in self.words.items() for word in item)
+
+    def remove(self, key: str):
+        """
+        Removes a key from the index.
+
+        Args:
+            key (str): Ssn
+        """
+        for word in self.words.pop(key, ()):
+            position = bisect.bisect_left(self.entries, (word, key))
+            if (position < len(self.entries)
+                    and self.entries[position] == (word, key)):
+                del self.entries[position]
+
+    def prefix(self, prefix: str, limit: int = 0) -> list[str]:
+        """
+        Returns the keys with a word that starts with prefix, in word order.
+
+        Args:
+            prefix (str): Start of the word
+            limit (int, optional): Most keys to return, 0 for all. Defaults to 0.
+
+        Returns:
+            list[str]: Keys, each key once
+        """
+        entries = self.entries
+        keys: dict[str, None] = {}
+        for position in range(bisect.bisect_left(entries, (prefix, )),
+                              len(entries)):
+            word, key = entries[position]
+            if not word.startswith(prefix) or (limit and len(keys) >= limit):
+                break
+            keys[key] = None
+        return list(keys)
+
+
+class RoomGuestIndex:
+    """
+    Which guest is booked into which room and the other way around, kept in sync by
+    HotelManager. The stored layout keeps the link twice (active[ssn].room and
+    rooms[room].user), check() tells if the two and the index agree.
+    """
+
+    def __init__(self):
+        """
+        Constructor for RoomGuestIndex
+        """
+        # ssn -> room id and room id -> ssn
+        self.room_of: dict[str, str] = {}
+        self.guest_of: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.room_of)
+
+    def link(self, ssn: str, room_id: str):
+        """
+        Links a guest and a room, their previous links are removed.
+
+        Args:
+            ssn (str): SSN of the guest
+            room_id (str): Room id
+        """
+        self.unlink(ssn)
+        if (guest := self.guest_of.get(room_id)) is not None:
+            del self.room_of[guest]
+        self.room_of[ssn] = room_id
+        self.guest_of[room_id] = ssn
+
+    def unlink(self, ssn: str) -> str | None:
+        """
+        Removes the link of a guest.
+
+        Args:
+            ssn (str): SSN of the guest
+
+        Returns:
+            str | None: Room id the guest was linked to, None if not linked
+        """
+        room_id = self.room_of.pop(ssn, None)
+        if room_id is not None and self.guest_of.get(room_id) == ssn:
+            del self.guest_of[room_id]
+        return room_id
+
+    def check(self,
+              users: Mapping[str, "User"],
+              rooms: Mapping[str, "Room"],
+              active: Mapping[str, "Booking"],
+              ssns: Collection[str] | None = None,
+              room_ids: Collection[str] | None = None) -> list[str]:
+        """
+        Checks that the bookings, the rooms' users and the index agree.
+        Only the given guests and rooms are checked, or everything if neither is given.
+
+        Args:
+            users (Mapping[str, User]): Registered users
+            rooms (Mapping[str, Room]): Rooms
+            active (Mapping[str, Booking]): Bookings
+            ssns (Collection[str] | None, optional): Guests to check. Defaults to None.
+            room_ids (Collection[str] | None, optional): Rooms to check. Defaults to None.
+
+        Returns:
+            list[str]: Description of every problem found, empty if all is in order
+        """
+        if ssns is None and room_ids is None:
+            ssns = active.keys() | self.room_of.keys()
+            room_ids = rooms.keys() | self.guest_of.keys()
+        problems = []
+        for ssn in ssns or ():
+            booking = active.get(ssn)
+            room_id = None if booking is None else str(booking.room)
+            if self.room_of.get(ssn) != room_id:
+                problems.append(f"Guest {ssn}: index has room {self.room_of.get(ssn)}, "
+                                f"booking has room {room_id}")
+            if booking is None:
+                continue
+            if ssn not in users:
+                problems.append(f"Guest {ssn}: booked but not registered")
+            if room_id not in rooms:
+                problems.append(f"Guest {ssn}: booked room {room_id} does not exist")
+            elif rooms[room_id].user != ssn:
+                problems.append(f"Guest {ssn}: room {room_id} has user "
+                                f"{rooms[room_id].user or 'none'}")
+        for room_id in room_ids or ():
+            user = rooms[room_id].user if room_id in rooms else ""
+            if self.guest_of.get(room_id, "") != user:
+                problems.append(f"Room {room_id}: index has guest "
+                                f"{self.guest_of.get(room_id)}, room has user {user or 'none'}")
+            if user and (user not in active or str(active[user].room) != room_id):
+                problems.append(f"Room {room_id}: user {user} is not booked into it")
+        return problems
+
+
+def _mutation(method):
+    """
+    Decorator for HotelManager methods that changes the hotel.
+    Only the outermost call is committed (and written to the journal), nested calls
+    (check_out -> unregister_user for example) are part of their caller.
+
+    Args:
+        method (Callable): HotelManager method to wrap
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        # Lock is shared with flush(), which may be called from the flush timer
+        with self._lock:
+            if (self.verify and self._depth == 0 and self._undo is None
+                    and not self._replaying):
+                # Verified as a transaction, so a change that breaks a link is rolled back
+                with self.transaction():
+                    return wrapper(self, *args, **kwargs)
+            if self._depth == 0:
+                self._changed = False
+            self._depth += 1
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                self._depth -= 1
+
+            # Failed calls does not change anything, hence nothing to commit
+            if self._depth == 0 and self._changed and not self._replaying:
+                self._commit(method.__name__, args, kwargs)
+            return result
+
+    return wrapper
+
+
+class HotelManager:
+    """
+    Class for managing a hotel database system.
+    Used to manipulate json data that a storage backend (JsonHandling by default)
+    returns when unpacking.
+
+    HotelManager uses methods for: checking in, checking out,
+    adding bookings, removing bookings, editing bookings, adding rooms,
+    removing rooms, editing rooms, register users, unregister users and printing raw json_data.
+    """
+
+    def __init__(self,
+                 filename: str = "",
+                 journal: bool = False,
+                 journal_limit: int = 1000,
+                 flush_every: int = 1,
+                 flush_interval: float = 0,
+                 fsync: str = "always",
+                 storage: StorageInterface | None = None,
+                 archive: bool = False,
+                 columns: bool = False,
+                 horizon: int = 365,
+                 verify: bool = False):
+        """
+        Constructor for HotelManager
+
+        Args:
+            filename (str, optional): Optional argument for the name of the file. Defaults to "".
+            journal (bool, optional): Append each change to a journal instead of rewriting
+                                    the whole file. Defaults to False.
+            journal_limit (int, optional): Amount of journal records before a new snapshot is written.
+                                    Defaults to 1000.
+            flush_every (int, optional): Flush after this many changes, 0 to disable. Defaults to 1.
+            flush_interval (float, optional): Flush at the latest this many milliseconds
+                                    after a change, 0 to disable. Defaults to 0.
+            fsync (str, optional): fsync policy of the json file, see JsonHandling.
+                                    Defaults to "always".
+            storage (StorageInterface | None, optional): Storage backend to use instead of
+                                    JsonHandling(filename, fsync). Defaults to None.
+            archive (bool, optional): Keep "old" in a compressed ColdArchive, loaded only
+                                    when needed, instead of the storage backend. Defaults to False.
+            columns (bool, optional): Also keep the rooms in a RoomColumns table
+                                    (self.room_columns) for analytics. Defaults to False.
+            horizon (int, optional): Nights from today covered by the availability
+                                    bitmaps of the rooms. Defaults to 365.
+            verify (bool, optional): Check the links between rooms and guests at startup
+                                    and after every change (only what changed), a change
+                                    that breaks them is rolled back and raises ValueError.
+                                    Defaults to False.
+
+        Raises:
+            ValueError: Journal mode with a storage backend that has no journal
+        """
+        self.journal = journal
+        self.journal_limit = journal_limit
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.archive = archive
+        self.verify = verify
+        # Bookkeeping for _mutation and the journal
+        self._depth = 0
+        self._changed = False
+        self._replaying = False
+        # Day the journal record being replayed was written, None when not replaying
+        self._replay_date: datetime.date | None = None
+        self._journal_size = 0
+        # Changes made since the last flush, collection -> changed keys (None means everything)
+        self._dirty: dict[str, set[str] | None] = {}
+        self._pending = 0
+        self._pending_records: list[dict] = []
+        self._timer: threading.Timer | None = None
+        self._lock = threading.RLock()
+        # Open transaction: undo log of (collection, key, previous value) and its journal records
+        self._undo: list[tuple[str, str | None, Any]] | None = None
+        self._undo_keys: set[tuple[str, str | None]] = set()
+        self._transaction_records: list[dict] = []
+
+        # Unpacking and loading json_data from given backend or path(Default is None)
+        self.storage: StorageInterface = (storage if storage is not None else
+                                          JsonHandling(filename, fsync))
+        if journal and not self.storage.SUPPORTS_JOURNAL:
+            raise ValueError(
+                f"{type(self.storage).__name__} does not support journal mode")
+        self.json_data = self.storage.unpack_data()
+
+        # Extracting or creating required structures
+        self.users = (self.json_data["users"]
+                      if "users" in self.json_data else dict())
+        self.rooms = (self.json_data["rooms"]
+                      if "rooms" in self.json_data else dict())
+        # Rooms used to be a list where the room number was the index + 1
+        legacy_rooms = isinstance(self.rooms, list)
+        if legacy_rooms:
+            self.rooms = {
+                str(index + 1): room
+                for index, room in enumerate(self.rooms)
+            }
+        # Stored dicts are converted to records once, here
+        self._load_collection("users", self.users)
+        self._load_collection("rooms", self.rooms)
+        # Room ids are never reused, the next id is stored with the snapshot
+        self._next_room_id = max(
+            self.json_data.get("next_room_id", 0),
+            max(map(int, self.rooms), default=0) + 1)
+        # All 'active' bookings are stored in active
+        self.active = (self.json_data["active"]
+                       if "active" in self.json_data else dict())
+        self._load_collection("active", self.active)
+        self.old = self.json_data["old"] if "old" in self.json_data else dict()
+        self._load_collection("old", self.old)
+        # Future stays, reservation id -> Reservation. Ids are never reused either
+        self.reservations = (self.json_data["reservations"]
+                             if "reservations" in self.json_data else dict())
+        self._load_collection("reservations", self.reservations)
+        self._next_reservation_id = max(
+            self.json_data.get("next_reservation_id", 0),
+            max(map(int, self.reservations), default=0) + 1)
+        # Older files can have guests stored under an ssn with dashes or spaces
+        moved_ssns = self._canonicalize_ssns()
+        # Sequence number of the last journal record included in the snapshot
+        self._seq = self.json_data["seq"] if "seq" in self.json_data else 0
+        # Number of the last snapshot written together with the archive, in every mode
+        self._snapshot = self.json_data.get("snapshot", 0)
+        # Secondary indexes of the rooms: state -> room ids, (state, capacity) -> sorted
+        # (price, room id) for range lookups, and the optional columns
+        self._rooms_by_state: dict[str, set[str]] = {}
+        self._room_prices: dict[tuple[str, int], list[tuple[int, int]]] = {}
+        self.room_columns: RoomColumns | None = RoomColumns() if columns else None
+        self.amenities = AmenityIndex()
+        # Words of the rooms' name, description and misc
+        self.room_text = TextIndex()
+        # Reservations of each room sorted by (arrival, departure, id), they never overlap,
+        # and the reservation ids of each guest
+        self._room_calendar: dict[str, list[tuple[datetime.date, datetime.date,
+                                                  str]]] = {}
+        self._reservations_by_ssn: dict[str, set[str]] = {}
+        # Availability of each room as an int, bit n is set when night horizon_start + n
+        # is taken (reserved, or tonight by an active booking)
+        self.horizon = horizon
+        self._horizon_start = datetime.date.today()
+        self._night_bitmaps: dict[str, int] = {}
+        self._build_room_index()
+        self._build_reservation_index()
+        # Which guest is in which room, both ways
+        self._occupancy = RoomGuestIndex()
+        self._build_occupancy()
+
+        if self.archive:
+            history = self.old
+            self.old = ColdArchive(filename or "hotel",
+                                   fsync=fsync != "never",
+                                   load=HistoryEntry.from_json,
+                                   dump=HistoryEntry.to_json)
+            self.old.recover(self._snapshot)
+            if history:
+                # History still in the storage backend, move it to the archive
+                self.old.update(history)
+                self._write_snapshot()
+        # Words of the guests' names, registered and (unless archived) in history
+        self.guest_text = TextIndex()
+        # Registered users by the words of their name and by ssn, for prefix lookups
+        self._user_names = PrefixIndex()
+        self._user_ssns = PrefixIndex()
+        # Built by the first guest search, startup does not pay for every name
+        self._guests_indexed = False
+
+        if self.journal:
+            # Rebuild state from the snapshot + journal, then start over with an empty journal
+            self._replay()
+            self.checkpoint()
+        elif legacy_rooms or moved_ssns or not all(
+                key in self.json_data
+                for key in ("users", "rooms", "active", "old")):
+            # Updates the file incase one of the values wasn't in the file (or is outdated)
+            self._write_snapshot()
+
+        if self.verify and (problems := self.check_integrity()):
+            raise ValueError("Rooms and guests are out of sync, " +
+                             "; ".join(problems[:10]))
+
+        # Type hinting for pylance, only noticeable in IDE with basic or strict type checking... Ignore
+        self.json_data: dict[str, Any]
+        self.users: dict[str, User]
+        self.rooms: dict[str, Room]
+        self.active: dict[str, Booking]
+        self.old: dict[str, HistoryEntry] | ColdArchive
+        self.reservations: dict[str, Reservation]
+
+    @staticmethod
+    def _load_collection(collection: str, data: dict):
+        """
+        Converts every stored dict of a collection to its record class (see RECORDS).
+
+        Args:
+            collection (str): "users", "rooms", "active", "old" or "reservations"
+            data (dict): Collection as stored, changed in place
+        """
+        record = RECORDS[collection]
+        for key, stored in data.items():
+            data[key] = record.from_json(stored)
+
+    def _canonicalize_ssns(self) -> bool:
+        """
+        Moves guests stored under an ssn with dashes or spaces to the canonical ssn,
+        in every collection at once (users, active, old, the rooms' users and reservations).
+
+        Raises:
+            ValueError: The canonical ssn of a guest is already used by another guest,
+                        the guest could not be reached after the move
+
+        Returns:
+            bool: True if any guest was moved
+        """
+        collections = (self.users, self.active, self.old)
+        # Every ssn the hotel refers to, most are canonical already and are
+        # checked without filling the cache
+        ssns = set().union(*collections)
+        ssns.update(room.user for room in self.rooms.values() if room.user)
+        ssns.update(reservation.ssn
+                    for reservation in self.reservations.values())
+        moved: dict[str, str] = {
+            ssn: canonical_ssn(ssn)
+            for ssn in ssns
+            if not (len(ssn) == 12 and ssn.isdigit()) and canonical_ssn(ssn)
+        }
+        if not moved:
+            return False
+
+        # Decided once per guest, a canonical ssn taken by anyone is a collision
+        sources: dict[str, list[str]] = {}
+        for ssn, key in moved.items():
+            sources.setdefault(key, []).append(ssn)
+        collisions = sorted(
+            " and ".join(sorted(ssns_of_key + ([key] if key in ssns else [])))
+            for key, ssns_of_key in sources.items()
+            if key in ssns or len(ssns_of_key) > 1)
+        if collisions:
+            raise ValueError("Guests share a canonical ssn, merge them by hand: " +
+                             "; ".join(collisions))
+
+        for data in collections:
+            for ssn in [ssn for ssn in data if ssn in moved]:
+                data[moved[ssn]] = data.pop(ssn)
+        for room in self.rooms.values():
+            room.user = moved.get(room.user, room.user)
+        for reservation in self.reservations.values():
+            reservation.ssn = moved.get(reservation.ssn, reservation.ssn)
+        return True
+
+    def __str__(self):
+        """
+        Returns a string representation of the class HotelManager.
+        Will ultimately return a string of amount of bookings, total room and vacant rooms.
+        """
+        # Vacant rooms are counted by the state index
+        return f"Total bookings: {len(self.active)}\nTotal rooms: {len(self.rooms)}\nVacant rooms: {self.count_rooms('vacant')} \nRegistered users: {len(self.users)}"
+
+    @_mutation
+    def register_user(self, ssn: str, name: str, age: str | int) -> str | bool:
+        """
+        Registers a user to the HotelManager.
+        Will return a string or boolean depending on success.
+        (Type check for the str or bool)
+
+        Args:
+            ssn (str): string of 12 characters representing a user's social security number
+            name (str): name of given user
+            age (str | int): age of given user
+
+        Returns:
+            str | bool: str on failure, boolean(True) on success
+        """
+        # Stored under the canonical ssn, "19900101-1234" is "199001011234"
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return "Invalid ssn"
+        # Check if a user is already registered
+        if ssn in self.users:
+            return "User with given ssn already exists"
+
+        # Check if age is a number
+        if not str(age).isdigit():
+            return "Age must be a number"
+        # Else add user to self.users with ssn as the key
+        self._mark_dirty("users", ssn)
+        self.users[ssn] = User(name, int(age))
+        self._index_guest(ssn)
+        return True
+
+    def been_registered(self, ssn: str) -> bool:
+        """
+        Checks if a user has been registered.
+
+        Args:
+            ssn (str): string of 12 characters representing a user's social security number
+
+        Returns:
+            bool: True if user is registered, False if not
+        """
+        return canonical_ssn(ssn) in self.old
+
+    def is_registered(self, ssn: str) -> bool:
+        """
+        Returns a boolean depending on whether a user is registered or not.
+
+        Args:
+            ssn (str): SSN of user
+
+        Returns:
+            bool: True if a user is registered, False otherwise
+        """
+        return canonical_ssn(ssn) in self.users
+
+    def is_ssn_valid(self, ssn: str) -> bool:
+        """Evaluate if ssn is valid
+
+        Args:
+            ssn (str): Social security number.
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        return bool(canonical_ssn(ssn))
+
+    @_mutation
+    def edit_user(self,
+                  ssn: str,
+                  name: str = "",
+                  age: str | int = "",
+                  new_ssn: str = "") -> bool:
+        """
+        Edits a user's information.
+
+        Args:
+            ssn (str): SSN of the CURRENTLY registered user, provide new_ssn to edit this
+            name (str, optional): New name. Defaults to "".
+            age (str | int, optional): New age. Defaults to "".
+            new_ssn (str, optional): New ssn, must not belong to another guest. Defaults to "".
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return False
+        if new_ssn and not (new_ssn := canonical_ssn(new_ssn)):
+            return False
+        # Age must be a number
+        if age != "" and not str(age).isdigit():
+            return False
+
+        # The new ssn can't belong to another guest, registered or in history
+        if new_ssn and new_ssn != ssn and (new_ssn in self.users
+                                           or new_ssn in self.active
+                                           or new_ssn in self.old):
+            return False
+
+        if ssn in self.users:
+            # If new ssn is provided, the key must be updated.
+            if new_ssn:
+                # Changes key in self.users to new_ssn(pop returns the value hence the assignment below)
+                self._mark_dirty("users", ssn)
+                self._mark_dirty("users", new_ssn)
+                self.users[new_ssn] = self.users.pop(ssn)
+                # Edit booking ssn
+                if ssn in self.active:
+                    self._mark_dirty("active", ssn)
+                    self._mark_dirty("active", new_ssn)
+                    booked_room = str(self.active[ssn].room)
+                    self._mark_dirty("rooms", booked_room)
+                    message = self.rooms[booked_room].message
+                    # The booking itself moves, checked in or not
+                    self._link_guest(new_ssn, booked_room, message,
+                                     self._unlink_guest(ssn))
+
+                # Edit old ssn
+                if ssn in self.old:
+                    self._mark_dirty("old", ssn)
+                    self._mark_dirty("old", new_ssn)
+                    self.old[new_ssn] = self.old.pop(ssn)
+                # Edit reservations ssn
+                for reservation_id in list(
+                        self._reservations_by_ssn.get(ssn, ())):
+                    self._mark_dirty("reservations", reservation_id)
+                    self._unindex_reservation(reservation_id)
+                    self.reservations[reservation_id].ssn = new_ssn
+                    self._index_reservation(reservation_id)
+                self._index_guest(ssn)
+                # To not interfere with multiple changes
+                ssn = new_ssn
+            if name or age != "":
+                self._mark_dirty("users", ssn)
+            if name:
+                self.users[ssn].name = name
+            if age != "":
+                self.users[ssn].age = int(age)
+            self._index_guest(ssn)
+            return True
+        # User is not registered
+        return False
+
+    @_mutation
+    def unregister_user(self, ssn: str) -> bool | str:
+        """
+        Unregister a user from the HotelManager.
+        Will return a string or boolean depending on success.
+
+        Args:
+            ssn (str): string of 12 characters representing a user's social security number
+
+        Returns:
+            str | bool: str on failure, boolean(True) on success
+        """
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return "Invalid ssn"
+
+        # Check if a user is already registered
+        if ssn not in self.users:
+            return "User with given ssn does not exist"
+
+        self._unregister_user(ssn)
+        return True
+
+    def _unregister_user(self, ssn: str):
+        """
+        Unregisters a user, the ssn is canonical and registered (see unregister_user).
+
+        Args:
+            ssn (str): Canonical ssn of the user
+        """
+        if ssn in self.active:
+            # Removes current booking, but does not unregister the user(yet)
+            self._remove_booking(ssn, False)
+        # Future stays are cancelled with the registration
+        for reservation_id in list(self._reservations_by_ssn.get(ssn, ())):
+            self.cancel_reservation(reservation_id)
+        self._mark_dirty("old", ssn)
+        self._mark_dirty("users", ssn)
+        user = self.users[ssn]
+        if ssn in self.old:
+            entry = self.old[ssn]
+            entry.name = user.name
+            entry.age = user.age
+        else:
+            entry = self.old[ssn] = HistoryEntry(user.name, user.age)
+        # Total registration count
+        entry.total_registrations += 1
+
+        del self.users[ssn]
+        self._index_guest(ssn)
+
+    def search_guests(self,
+                      text: str,
+                      limit: int = 0,
+                      match_all: bool = True) -> dict[str, User | HistoryEntry]:
+        """
+        Searches the names of registered users and guests in history, best match first.
+        History is not searched when it is archived (HotelManager(archive=True)).
+
+        Args:
+            text (str): Words of the name, case does not matter
+            limit (int, optional): Most guests to return, 0 for all. Defaults to 0.
+            match_all (bool, optional): Names must have every word, otherwise any word.
+                                    Defaults to True.
+
+        Returns:
+            dict[str, User | HistoryEntry]: ssn -> user, or history entry if not registered
+        """
+        self._ensure_guest_index()
+        return {
+            ssn: self.users[ssn] if ssn in self.users else self.old[ssn]
+            for ssn, _ in self.guest_text.search(text, limit, match_all)
+        }
+
+    def find_users(self,
+                   name: str = "",
+                   ssn: str = "",
+                   limit: int = 0) -> dict[str, User]:
+        """
+        Finds registered users by the start of a name and/or of the ssn.
+        Example: find_users(name="sven") or find_users(ssn="19900101")
+
+        Args:
+            name (str, optional): Start of any word of the name, case does not matter.
+                                    Defaults to "".
+            ssn (str, optional): Start of the ssn, example: YYYYMMDD. Defaults to "".
+            limit (int, optional): Most users to return, 0 for all. Defaults to 0.
+
+        Raises:
+            ValueError: Neither name nor ssn is given
+
+        Returns:
+            dict[str, User]: ssn -> user, in order of name (or ssn if only ssn is given)
+        """
+        ssn = ssn.replace("-", "").replace(" ", "")
+        if not name and not ssn:
+            raise ValueError("Name or ssn must be given")
+        self._ensure_guest_index()
+        if name:
+            words = tokenize(name)
+            # Users with a word starting with the first word, that also match the rest
+            ssns = self._user_names.prefix(words[0] if words else "")
+            ssns = [
+                key for key in ssns
+                if key.startswith(ssn) and all(
+                    any(word.startswith(part)
+                        for word in self._user_names.words[key])
+                    for part in words[1:])
+            ]
+            if limit:
+                ssns = ssns[:limit]
+        else:
+            ssns = self._user_ssns.prefix(ssn, limit)
+        return {key: self.users[key] for key in ssns}
+
+    def _index_guest(self, ssn: str):
+        """
+        Indexes the names of a guest again, call after the user or history entry changed.
+
+        Args:
+            ssn (str): SSN of the guest
+        """
+        if not self._guests_indexed:
+            return
+        names = []
+        if ssn in self.users:
+            names.append(self.users[ssn].name)
+        # The archive is on disk, it is not indexed
+        if (not self.archive and ssn in self.old
+                and self.old[ssn].name not in names):
+            names.append(self.old[ssn].name)
+        if names:
+            self.guest_text.add(ssn, " ".join(names))
+        else:
+            self.guest_text.remove(ssn)
+        if ssn in self.users:
+            self._user_names.add(ssn, tokenize(self.users[ssn].name))
+            self._user_ssns.add(ssn, (ssn, ))
+        else:
+            self._user_names.remove(ssn)
+            self._user_ssns.remove(ssn)
+
+    def _ensure_guest_index(self):
+        """
+        Builds the guest indexes if they are not built yet, they are kept up to date after.
+        """
+        if not self._guests_indexed:
+            self._build_guest_index()
+
+    def _build_guest_index(self):
+        """
+        Rebuilds the text index of the guests' names and the prefix indexes of the users.
+        """
+        # Same text as _index_guest gives each guest
+        texts = {ssn: user.name for ssn, user in self.users.items()}
+        if not self.archive:
+            for ssn, entry in self.old.items():
+                if ssn not in texts:
+                    texts[ssn] = entry.name
+                elif entry.name != texts[ssn]:
+                    texts[ssn] += " " + entry.name
+        self.guest_text = TextIndex()
+        self.guest_text.build(texts)
+        self._user_names = PrefixIndex()
+        self._user_names.build({
+            ssn: tokenize(user.name)
+            for ssn, user in self.users.items()
+        })
+        self._user_ssns = PrefixIndex()
+        self._user_ssns.build({ssn: (ssn, ) for ssn in self.users})
+        self._guests_indexed = True
+
+    @_mutation
+    def check_in(self, ssn: str) -> bool:
+        """
+        Called when user is trying to check in to hotel
+
+        Args:
+            ssn (str): ssn of user wanting to check in
+
+        Returns:
+            bool: Boolean on success or failure
+        """
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return False
+
+        # Checks if user exists
+        if ssn in self.users:
+            # Check if already booked
+            if ssn in self.active:
+                # Check if not checked in
+                if not self.active[ssn].checked_in:
+                    # Good to check in...
+                    self._mark_dirty("active", ssn)
+                    self.active[ssn].checked_in = True
+                    return True
+        # If the controlstructure failed, returns False.
+        return False
+
+    @_mutation
+    def check_out(self, ssn: str, unregister: bool) -> bool:
+        """
+        Called when user is trying to check out to hotel
+
+        Args:
+            ssn (str): ssn of user wanting to check out
+            unregister (bool): Boolean on whether to unregister user or not
+
+        Returns:
+            bool: Boolean on success or failure
+        """
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return False
+
+        # Check if user exists and is booked
+        if ssn in self.users and ssn in self.active:
+            # Check if checked in
+            if self.active[ssn].checked_in:
+                # Good to check out...
+                booked_room = str(self.active[ssn].room)
+                self._mark_dirty("rooms", booked_room)
+                self._mark_dirty("active", ssn)
+                self._set_room_state(booked_room, "vacant")
+                # Remove booking from active dict and the room's user
+                self._unlink_guest(ssn)
+                if unregister:
+                    self._unregister_user(ssn)
+                return True
+        # If the controlstructure failed, returns False.
+        return False
+
+    @_mutation
+    def add_booking(self,
+                    ssn: str,
+                    room: str,
+                    message: str = "",
+                    _override_is_booked=False) -> bool:
+        """
+        Called when user is booking a room. Must be registered to add booking.
+        A room reserved tonight can only be booked by the guest of the reservation.
+
+        Args:
+            ssn (str): ssn of user\n
+            room (str): room id(digits): "1", "2", "3" etc.
+            message (str, optional): message from user. Defaults to "".
+            _override_is_booked (bool, optional): Overrides the check for already book 
+            (use with precaution). Defaults to False.
+
+        Returns:
+            bool: Boolean on success or failure
+        """
+
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return False
+        return self._add_booking(ssn, room, message, _override_is_booked)
+
+    def _add_booking(self,
+                     ssn: str,
+                     room: str,
+                     message: str = "",
+                     override_is_booked: bool = False) -> bool:
+        """
+        Books a room, the ssn is canonical (see add_booking).
+
+        Args:
+            ssn (str): Canonical ssn of the user
+            room (str): Room id
+            message (str, optional): message from user. Defaults to "".
+            override_is_booked (bool, optional): Overrides the check for already booked.
+                                    Defaults to False.
+
+        Returns:
+            bool: Boolean on success or failure
+        """
+        # Checks if user exists and NOT already booked
+
+        if ssn in self.users:
+            if ssn not in self.active or override_is_booked:
+                # Check if room exists
+                if room in self.rooms:
+                    #  Check if room is vacant, and not reserved tonight by someone else
+                    if (self.rooms[room].state == "vacant"
+                            and self._reserved_tonight(room) in ("", ssn)):
+                        self._mark_dirty("rooms", room)
+                        self._mark_dirty("active", ssn)
+                        # Change room state to occupied
+                        self._set_room_state(room, "occupied")
+                        # Add booking to active dict and set the room's user
+                        self._link_guest(ssn, room, message)
+                        return True
+        # If the controlstructure failed, returns False.
+        return False
+
+    def is_booked(self, ssn: str) -> bool:
+        """
+        Returns a boolean depending on whether a user is booked or not.
+
+        Args:
+            ssn (str): SSN of user
+
+        Returns:
+            bool: True if a user is booked, False otherwise
+        """
+        return canonical_ssn(ssn) in self.active
+
+    def room_of_guest(self, ssn: str) -> str | None:
+        """
+        Returns the room a guest is booked into.
+
+        Args:
+            ssn (str): SSN of user
+
+        Returns:
+            str | None: Room id, None if the guest is not booked
+        """
+        return self._occupancy.room_of.get(canonical_ssn(ssn))
+
+    def guest_in_room(self, room_id: str) -> str | None:
+        """
+        Returns the guest booked into a room.
+
+        Args:
+            room_id (str): Room id
+
+        Returns:
+            str | None: SSN of the guest, None if nobody is booked into the room
+        """
+        return self._occupancy.guest_of.get(room_id)
+
+    def check_integrity(self,
+                        ssns: Collection[str] | None = None,
+                        room_ids: Collection[str] | None = None) -> list[str]:
+        """
+        Checks that every booking and the user of its room point at each other,
+        and that the room and guest index agrees. Checks everything if neither
+        ssns nor room_ids is given.
+
+        Args:
+            ssns (Collection[str] | None, optional): Guests to check. Defaults to None.
+            room_ids (Collection[str] | None, optional): Rooms to check. Defaults to None.
+
+        Returns:
+            list[str]: Description of every problem found, empty if all is in order
+        """
+        return self._occupancy.check(self.users, self.rooms, self.active,
+                                     ssns, room_ids)
+
+    def _verify_changes(self):
+        """
+        Checks the guests and rooms changed since the last flush.
+
+        Raises:
+            ValueError: A room and its guest are out of sync
+        """
+        ssns = self._dirty.get("active", set())
+        room_ids = self._dirty.get("rooms", set())
+        if ssns is None or room_ids is None:
+            # A whole collection changed
+            problems = self.check_integrity()
+        else:
+            problems = self.check_integrity(ssns, room_ids)
+        if problems:
+            raise ValueError("Rooms and guests are out of sync, " +
+                             "; ".join(problems[:10]))
+
+    def _link_guest(self,
+                    ssn: str,
+                    room_id: str,
+                    message: str = "",
+                    booking: Booking | None = None):
+        """
+        Books a guest into a room, the booking, the room's user and the index
+        are changed together. Mark both as dirty before calling.
+
+        Args:
+            ssn (str): Canonical ssn of the guest
+            room_id (str): Room id
+            message (str, optional): message from user. Defaults to "".
+            booking (Booking | None, optional): Existing booking to move. Defaults to None.
+        """
+        room = self.rooms[room_id]
+        room.user = ssn
+        room.message = message
+        self.active[ssn] = booking if booking is not None else Booking(room_id)
+        self._occupancy.link(ssn, room_id)
+
+    def _unlink_guest(self, ssn: str) -> Booking:
+        """
+        Removes the booking of a guest together with the user and message of its room.
+        Mark both as dirty before calling.
+
+        Args:
+            ssn (str): Canonical ssn of the guest
+
+        Returns:
+            Booking: The removed booking
+        """
+        booking = self.active.pop(ssn)
+        room = self.rooms.get(str(booking.room))
+        if room is not None and room.user == ssn:
+            room.user = ""
+            room.message = ""
+        self._occupancy.unlink(ssn)
+        return booking
+
+    def _build_occupancy(self):
+        """
+        Rebuilds the room and guest index from the bookings.
+        """
+        self._occupancy = RoomGuestIndex()
+        for ssn, booking in self.active.items():
+            self._occupancy.link(ssn, str(booking.room))
+
+    @_mutation
+    def remove_booking(self, ssn: str, unregister: bool) -> bool:
+        """
+        Called when user is trying to remove a booking. Must be registered to remove booking.
+
+        Args:
+            ssn (str): _description_
+            unregister (bool): unregister the user when removing booking
+
+        Returns:
+            bool: _description_
+        """
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return False
+        return self._remove_booking(ssn, unregister)
+
+    def _remove_booking(self, ssn: str, unregister: bool) -> bool:
+        """
+        Removes a booking, the ssn is canonical (see remove_booking).
+
+        Args:
+            ssn (str): Canonical ssn of the user
+            unregister (bool): unregister the user when removing booking
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        # Check if user exists and is booked
+        if ssn in self.users and ssn in self.active:
+            # Check if not checked in
+            if not self.active[ssn].checked_in:
+                # Change room state to vacant
+                booked_room = str(self.active[ssn].room)
+                self._mark_dirty("rooms", booked_room)
+                self._mark_dirty("active", ssn)
+                self._set_room_state(booked_room, "vacant")
+                # Remove booking from active dict and the room's user and message
+                self._unlink_guest(ssn)
+                if unregister:
+                    # Unregister user
+                    self._unregister_user(ssn)
+                return True
+        # If the controlstructure failed, returns False.
+        return False
+
+    @_mutation
+    def _change_room_state(self,
+                           room_number: str,
+                           state: str = "vacant") -> tuple[str, str] | bool:
+        """
+        Manually change rooms state, private method as it is supposed to only 
+        be called when editing a booking.
+
+        Args:
+            room_number (str): Room id
+            state (str, optional): What state (optional incase further implementation). Defaults to "vacant".
+
+        Returns:
+            bool: True on success, else False
+        """
+
+        # Check if room exists
+        if room_number in self.rooms:
+            self._mark_dirty("rooms", room_number)
+            room = self.rooms[room_number]
+            # Manually change state (note it does not care about user or message):
+            self._set_room_state(room_number, state)
+            message = str(room.message)
+            ssn = str(room.user)
+
+            # Unset message and user
+            room.message = ""
+            room.user = ""
+            return (message, ssn)
+        return False
+
+    @_mutation
+    def edit_booking(self, ssn: str, new_room: str = "", message: str = ""):
+        """
+        Called when user is trying to edit a booking. Must be registered to edit booking.
+
+        Args:
+            ssn (str): SSN of user
+            new_room (str, optional): If wished to swap room. Defaults to "".
+            message (str, optional): Messages, can be passed alone or with new_room. Defaults to "".
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        ssn = canonical_ssn(ssn)
+        if not ssn:
+            return False
+
+        if ssn in self.users and ssn in self.active:
+            if new_room:
+                # The current room is only given up for a vacant one that is
+                # not reserved tonight by someone else, same check as _add_booking
+                if (new_room in self.rooms
+                        and self.rooms[new_room].state == "vacant"
+                        and self._reserved_tonight(new_room) in ("", ssn)):
+                    old_room = str(self.active[ssn].room)
+                    # Change room state to vacant, returns message and ssn
+                    if type(result := self._change_room_state(
+                            old_room)) == tuple:
+                        old_message, old_ssn = result  # type: ignore
+                        if (self._add_booking(old_ssn,
+                                              new_room,
+                                              old_message,
+                                              override_is_booked=True)):
+                            return True
+            elif message:
+                booked_room = str(self.active[ssn].room)
+                self._mark_dirty("rooms", booked_room)
+                self.rooms[booked_room].message = message
+                return True
+        return False
+
+    @_mutation
+    def add_room(
+        self,
+        name: str,
+        price: str | int,
+        capacity: str | int,
+        state: str,
+        description: str,
+        misc: list[str],
+    ) -> bool:
+        """
+        Adds a room to the hotel.
+
+        Args:
+            name (str): Name of the room, example: JuniorSuite\n
+            price (str | int): Price per night, example: 19.99 (or 1999 as int cents)\n
+            capacity (str | int): How many can fit? example: 2\n
+            state (str): State of the room, example: vacant or occupied\n
+            description (str): A short description, who its fitted for\n
+            misc (list[str]): list of additional information, example: wifi, type of bed, etc.\n
+
+        Returns:
+            bool: True if operation was successful, False otherwise
+        """
+        user: str = ""
+        message: str = ""
+        # Numbers are parsed here once, stored typed
+        try:
+            price = parse_price(price)
+            capacity = int(capacity)
+        except ValueError:
+            return False
+        room_id = str(self._next_room_id)
+        self._next_room_id += 1
+        self._mark_dirty("rooms", room_id)
+        self.rooms[room_id] = Room(name, price, capacity, state, description,
+                                   misc, user, message)
+        self._index_room(room_id)
+        return True
+
+    @_mutation
+    def remove_room(self, room_nr: str) -> bool:
+        """
+        Removes a room from the hotel. A room with a checked in guest is kept,
+        the guest has to check out first.
+
+        Args:
+            room_nr (str): Room id
+
+        Returns:
+            bool: True if operation was successful, False otherwise
+        """
+        if room_nr in self.rooms:
+            # Check if room is booked, handle accordingly. Found through the bookings,
+            # the room's user can be out of step with them in older files
+            user = self._occupancy.guest_of.get(room_nr)
+            if user is not None:
+                if self.active[user].checked_in:
+                    return False
+                self._remove_booking(user, unregister=False)
+            # Reservations of the room are cancelled
+            for _, _, reservation_id in list(
+                    self._room_calendar.get(room_nr, ())):
+                self.cancel_reservation(reservation_id)
+
+            # Other rooms keep their ids
+            self._mark_dirty("rooms", room_nr)
+            self._unindex_room(room_nr)
+            del self.rooms[room_nr]
+            return True
+        return False
+
+    @_mutation
+    def edit_room(
+        self,
+        room_id: str,
+        name: str = "",
+        price: str | int = "",
+        capacity: str | int = "",
+        state: str = "",
+        description: str = "",
+        misc: list[str] = [],
+    ):
+        """
+        Edits a room in the hotel. Only the fields that are not empty will change.
+
+        Args:
+            room_id (str): Room id
+            name (str): Name of the room, example: JuniorSuite\n
+            price (str | int): Price per night, example: 19.99 (or 1999 as int cents)\n
+            capacity (str | int): How many can fit? example: 2\n
+            state (str): State of the room, example: vacant or occupied\n
+            description (str): A short description, who its fitted for\n
+            misc (list[str]): list of additional information, example: wifi, type of bed, etc.\n
+        """
+        if room_id in self.rooms:
+            try:
+                price = parse_price(price) if price != "" else ""
+                capacity = int(capacity) if capacity != "" else ""
+            except ValueError:
+                return False
+            self._mark_dirty("rooms", room_id)
+            room = self.rooms[room_id]
+            self._unindex_room(room_id)
+            if name:
+                room.name = name
+            if price != "":
+                room.price = price
+            if capacity != "":
+                room.capacity = capacity
+            if state:
+                room.state = sys.intern(state)
+            if description:
+                room.description = description
+            if misc:
+                room.misc = misc
+            self._index_room(room_id)
+            return True
+        return False
+
+    def rooms_in_state(self, state: str = "vacant") -> dict[str, dict]:
+        """
+        Returns the rooms that are in a state, looked up in the state index.
+
+        Args:
+            state (str, optional): State of the rooms, example: vacant or occupied.
+                                    Defaults to "vacant".
+
+        Returns:
+            dict[str, dict]: Room id -> room, in room id order
+        """
+        room_ids = self._rooms_by_state.get(state, ())
+        return {
+            room_id: self.rooms[room_id]
+            for room_id in sorted(room_ids, key=int)
+        }
+
+    def count_rooms(self, state: str = "") -> int:
+        """
+        Returns the amount of rooms in a state, or all rooms if no state is given.
+
+        Args:
+            state (str, optional): State of the rooms, example: vacant. Defaults to "".
+
+        Returns:
+            int: Amount of rooms
+        """
+        if not state:
+            return len(self.rooms)
+        return len(self._rooms_by_state.get(state, ()))
+
+    def rooms_with_amenities(self,
+                             amenities: Collection[str],
+                             state: str = "vacant") -> dict[str, Room]:
+        """
+        Returns the rooms that have all the amenities, looked up in the amenity index.
+        Example: rooms_with_amenities(["wifi", "fridge", "microwave"])
+
+        Args:
+            amenities (Collection[str]): Amenities the rooms must have (in their misc)
+            state (str, optional): State of the rooms, "" for all rooms.
+                                    Defaults to "vacant".
+
+        Returns:
+            dict[str, Room]: Room id -> room, in room id order
+        """
+        room_ids = self.amenities.matching(
+            amenities,
+            self._rooms_by_state.get(state, set()) if state else None)
+        return {
+            room_id: self.rooms[room_id]
+            for room_id in sorted(room_ids, key=int)
+        }
+
+    def search_rooms(self,
+                     text: str,
+                     limit: int = 0,
+                     match_all: bool = True) -> dict[str, Room]:
+        """
+        Searches the words of the rooms' name, description and misc, best match first.
+        Example: search_rooms("double bed wifi")
+
+        Args:
+            text (str): Words to search for, case does not matter
+            limit (int, optional): Most rooms to return, 0 for all. Defaults to 0.
+            match_all (bool, optional): Rooms must have every word, otherwise any word.
+                                    Defaults to True.
+
+        Returns:
+            dict[str, Room]: Room id -> room, in order of rank
+        """
+        return {
+            room_id: self.rooms[room_id]
+            for room_id, _ in self.room_text.search(text, limit, match_all)
+        }
+
+    @staticmethod
+    def _room_document(room: Room) -> str:
+        """Returns the text of a room for the text index"""
+        return " ".join((room.name, room.description, *room.type.misc))
+
+    def _build_room_index(self):
+        """
+        Rebuilds the room indexes from self.rooms.
+        """
+        self._rooms_by_state = {}
+        self._room_prices = {}
+        for room_id, room in self.rooms.items():
+            self._rooms_by_state.setdefault(room.state, set()).add(room_id)
+            self._room_prices.setdefault((room.state, room.capacity),
+                                         []).append((room.price, int(room_id)))
+        # Sorted once, inserting one by one would move the lists n times
+        for prices in self._room_prices.values():
+            prices.sort()
+        self._build_night_bitmaps()
+        self.amenities = AmenityIndex()
+        self.room_text = TextIndex()
+        for room_id, room in self.rooms.items():
+            self.amenities.add(room_id, room.type.misc)
+            self.room_text.add(room_id, self._room_document(room))
+        if self.room_columns is not None:
+            self.room_columns = RoomColumns()
+            for room_id, room in self.rooms.items():
+                self.room_columns.add(room_id, room)
+
+    def _index_room(self, room_id: str):
+        """
+        Adds a room to the room indexes, call after the room is added or changed.
+
+        Args:
+            room_id (str): Room id
+        """
+        room = self.rooms[room_id]
+        self._rooms_by_state.setdefault(room.state, set()).add(room_id)
+        self._insert_price(room_id, room)
+        if self.room_columns is not None:
+            self.room_columns.add(room_id, room)
+        self.amenities.add(room_id, room.type.misc)
+        self.room_text.add(room_id, self._room_document(room))
+        self._night_bitmaps[room_id] = self._room_nights(room_id)
+
+    def _unindex_room(self, room_id: str):
+        """
+        Removes a room from the room indexes, call before the room is changed or removed.
+
+        Args:
+            room_id (str): Room id
+        """
+        room = self.rooms[room_id]
+        self._discard_state(room_id, room.state)
+        self._remove_price(room_id, room)
+        if self.room_columns is not None:
+            self.room_columns.remove(room_id)
+        self.amenities.remove(room_id)
+        self.room_text.remove(room_id)
+        self._night_bitmaps.pop(room_id, None)
+
+    def _discard_state(self, room_id: str, state: str):
+        """
+        Removes a room from the state index.
+
+        Args:
+            room_id (str): Room id
+            state (str): State the room is indexed under
+        """
+        if (room_ids := self._rooms_by_state.get(state)) is not None:
+            room_ids.discard(room_id)
+            if not room_ids:
+                del self._rooms_by_state[state]
+
+    def _insert_price(self, room_id: str, room: Room):
+        """
+        Inserts a room into the sorted price list of its state and capacity.
+
+        Args:
+            room_id (str): Room id
+            room (Room): The room
+        """
+        bisect.insort(
+            self._room_prices.setdefault((room.state, room.capacity), []),
+            (room.price, int(room_id)))
+
+    def _remove_price(self, room_id: str, room: Room):
+        """
+        Removes a room from the sorted price list of its state and capacity.
+
+        Args:
+            room_id (str): Room id
+            room (Room): The room, as it was indexed
+        """
+        key = (room.state, room.capacity)
+        if (prices := self._room_prices.get(key)) is None:
+            return
+        entry = (room.price, int(room_id))
+        position = bisect.bisect_left(prices, entry)
+        if position < len(prices) and prices[position] == entry:
+            del prices[position]
+            if not prices:
+                del self._room_prices[key]
+
+    def _set_room_state(self, room_id: str, state: str):
+        """
+        Changes the state of a room and keeps the room indexes up to date.
+
+        Args:
+            room_id (str): Room id
+            state (str): New state, example: vacant or occupied
+        """
+        room = self.rooms[room_id]
+        self._discard_state(room_id, room.state)
+        self._remove_price(room_id, room)
+        room.state = state
+        self._rooms_by_state.setdefault(state, set()).add(room_id)
+        self._insert_price(room_id, room)
+        if self.room_columns is not None:
+            self.room_columns.update(room_id, room)
+        # Booked, checked out etc. changes whether the room is taken tonight
+        self._update_tonight(room_id)
+
+    def find_rooms(self,
+                   min_capacity: int = 0,
+                   max_price: str | int | None = None,
+                   state: str = "",
+                   limit: int = 0) -> dict[str, Room]:
+        """
+        Finds the rooms that fit at least min_capacity guests and cost at most max_price,
+        cheapest first. The price lists of every matching state and capacity are cut at
+        max_price by bisect and merged, O(g log n + k) for g lists and k rooms.
+
+        Example, cheapest vacant room that fits 3:
+            hotel.find_rooms(min_capacity=3, state="vacant", limit=1)
+
+        Args:
+            min_capacity (int, optional): Least amount of guests. Defaults to 0.
+            max_price (str | int | None, optional): Highest price per night, "50.00"
+                                    or int cents. Defaults to None (any price).
+            state (str, optional): Only rooms in this state. Defaults to "" (any state).
+            limit (int, optional): Maximum amount of rooms, 0 for all. Defaults to 0.
+
+        Raises:
+            ValueError: Invalid max_price
+
+        Returns:
+            dict[str, Room]: Room id -> room, cheapest first
+        """
+        max_cents = None if max_price is None else parse_price(max_price)
+        min_capacity = int(min_capacity)
+
+        runs = []
+        for (room_state, capacity), prices in self._room_prices.items():
+            if capacity < min_capacity or (state and room_state != state):
+                continue
+            end = (len(prices) if max_cents is None else bisect.bisect_right(
+                prices, (max_cents, float("inf"))))
+            # Read lazily, merge only takes what is needed for the limit
+            runs.append(itertools.islice(prices, end))
+
+        found: dict[str, Room] = {}
+        for _, room_id in itertools.islice(heapq.merge(*runs), limit or None):
+            found[str(room_id)] = self.rooms[str(room_id)]
+        return found
+
+    @_mutation
+    def add_reservation(self,
+                        ssn: str,
+                        room: str,
+                        arrival: str | datetime.date,
+                        departure: str | datetime.date,
+                        message: str = "") -> str | bool:
+        """
+        Reserves a room for a future stay. Must be registered to reserve.
+        The room must be free (no other reservation) every night from arrival up to departure,
+        and not occupied if the stay includes tonight (the same check as available_rooms).
+
+        Args:
+            ssn (str): ssn of user
+            room (str): room id(digits): "1", "2", "3" etc.
+            arrival (str | datetime.date): First night, YYYY-MM-DD
+            departure (str | datetime.date): Day of departure (not a night of the stay), YYYY-MM-DD
+            message (str, optional): message from user. Defaults to "".
+
+        Returns:
+            str | bool: Reservation id on success, False on failure
+        """
+        ssn = canonical_ssn(ssn)
+        if not ssn or ssn not in self.users:
+            return False
+        if room not in self.rooms:
+            return False
+        try:
+            arrival = parse_date(arrival)
+            departure = parse_date(departure)
+        except ValueError:
+            return False
+        if arrival >= departure or not self._is_available(
+                room, arrival, departure):
+            return False
+
+        reservation_id = str(self._next_reservation_id)
+        self._next_reservation_id += 1
+        self._mark_dirty("reservations", reservation_id)
+        self.reservations[reservation_id] = Reservation(
+            ssn, room, arrival, departure, message)
+        self._index_reservation(reservation_id)
+        return reservation_id
+
+    @_mutation
+    def cancel_reservation(self, reservation_id: str) -> bool:
+        """
+        Cancels a reservation.
+
+        Args:
+            reservation_id (str): Reservation id
+
+        Returns:
+            bool: True on success, False if there is no such reservation
+        """
+        if reservation_id not in self.reservations:
+            return False
+        self._mark_dirty("reservations", reservation_id)
+        self._unindex_reservation(reservation_id)
+        del self.reservations[reservation_id]
+        return True
+
+    def available_rooms(self,
+                        start: str | datetime.date,
+                        end: str | datetime.date,
+                        min_capacity: int = 0) -> dict[str, Room]:
+        """
+        Returns the rooms that are free every night from start up to end.
+        Within the horizon each room is checked with one AND of its bitmap,
+        otherwise with one bisect in its reservations, O(log m) per room.
+        A room occupied by an active booking is taken tonight.
+
+        Args:
+            start (str | datetime.date): First night, YYYY-MM-DD
+            end (str | datetime.date): Day of departure, YYYY-MM-DD
+            min_capacity (int, optional): Least amount of guests. Defaults to 0.
+
+        Raises:
+            ValueError: Invalid date, or end is not after start
+
+        Returns:
+            dict[str, Room]: Room id -> room
+        """
+        start = parse_date(start)
+        end = parse_date(end)
+        if start >= end:
+            raise ValueError("End must be after start")
+        self._roll_horizon()
+        if (start >= self._horizon_start and
+            (end - self._horizon_start).days <= self.horizon):
+            mask = self._night_mask(start, end)
+            bitmaps = self._night_bitmaps
+            return {
+                room_id: room
+                for room_id, room in self.rooms.items()
+                if room.capacity >= min_capacity
+                and not bitmaps.get(room_id, 0) & mask
+            }
+        return {
+            room_id: room
+            for room_id, room in self.rooms.items()
+            if room.capacity >= min_capacity
+            and self._is_available(room_id, start, end)
+        }
+
+    def room_reservations(self, room_id: str) -> list[Reservation]:
+        """
+        Returns the reservations of a room, in order of arrival.
+
+        Args:
+            room_id (str): Room id
+
+        Returns:
+            list[Reservation]: Reservations of the room
+        """
+        return [
+            self.reservations[reservation_id]
+            for _, _, reservation_id in self._room_calendar.get(room_id, ())
+        ]
+
+    def _is_available(self, room_id: str, start: datetime.date,
+                      end: datetime.date) -> bool:
+        """
+        Checks that a room is free every night from start up to end, no reservation
+        overlaps and, if the nights include tonight, no active booking has the room.
+
+        Args:
+            room_id (str): Room id
+            start (datetime.date): First night
+            end (datetime.date): Day of departure
+
+        Returns:
+            bool: True if the room is available
+        """
+        if (start <= self._today() < end
+                and self.rooms[room_id].state == "occupied"):
+            return False
+        return self._is_free(room_id, start, end)
+
+    def _today(self) -> datetime.date:
+        """
+        Returns today, or the day a journal record was written while it is replayed.
+
+        Returns:
+            datetime.date: Day of tonight's night
+        """
+        return self._replay_date or datetime.date.today()
+
+    def _reserved_tonight(self, room_id: str) -> str:
+        """
+        Returns who has a reservation of a room that covers tonight.
+
+        Args:
+            room_id (str): Room id
+
+        Returns:
+            str: SSN of the guest, empty if the room is not reserved tonight
+        """
+        calendar = self._room_calendar.get(room_id)
+        if not calendar:
+            return ""
+        today = self._today()
+        # The last reservation arriving today or earlier is the only one that can cover tonight
+        position = bisect.bisect_left(calendar,
+                                      (today + datetime.timedelta(days=1), ))
+        if position and calendar[position - 1][1] > today:
+            return self.reservations[calendar[position - 1][2]].ssn
+        return ""
+
+    def _is_free(self, room_id: str, start: datetime.date,
+                 end: datetime.date) -> bool:
+        """
+        Checks that no reservation of a room overlaps the nights from start up to end.
+
+        Args:
+            room_id (str): Room id
+            start (datetime.date): First night
+            end (datetime.date): Day of departure
+
+        Returns:
+            bool: True if the room is free
+        """
+        calendar = self._room_calendar.get(room_id)
+        if not calendar:
+            return True
+        # Reservations don't overlap, so the last one arriving before end is the
+        # one that departs last, it is the only one that can overlap
+        position = bisect.bisect_left(calendar, (end, ))
+        return position == 0 or calendar[position - 1][1] <= start
+
+    def calendar(self,
+                 start: str | datetime.date = "",
+                 nights: int = 0) -> dict[str, str]:
+        """
+        Returns the availability of every room night by night, from the bitmaps.
+        Each night is "." when the room is free and "x" when it is taken.
+
+        Args:
+            start (str | datetime.date, optional): First night, YYYY-MM-DD. Defaults to today.
+            nights (int, optional): Amount of nights. Defaults to the rest of the horizon.
+
+        Raises:
+            ValueError: Invalid date, or the nights are not within the horizon
+
+        Returns:
+            dict[str, str]: Room id -> one character per night
+        """
+        self._roll_horizon()
+        offset = (parse_date(start) - self._horizon_start).days if start else 0
+        nights = nights or self.horizon - offset
+        if offset < 0 or nights < 0 or offset + nights > self.horizon:
+            raise ValueError("Nights must be within the horizon")
+        window = (1 << nights) - 1
+        layout = f"0{nights}b" if nights else ""
+        table = str.maketrans("01", ".x")
+        # Lowest bit is the first night, format puts it last
+        return {
+            room_id: format(
+                (self._night_bitmaps.get(room_id, 0) >> offset) & window,
+                layout)[::-1].translate(table)
+            for room_id in self.rooms
+        }
+
+    def _night_mask(self, start: datetime.date, end: datetime.date) -> int:
+        """
+        Returns the bits of the nights from start up to end, cut to the horizon.
+
+        Args:
+            start (datetime.date): First night
+            end (datetime.date): Day of departure
+
+        Returns:
+            int: Bitmap of the nights
+        """
+        first = max((start - self._horizon_start).days, 0)
+        last = min((end - self._horizon_start).days, self.horizon)
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def _room_nights(self, room_id: str) -> int:
+        """
+        Computes the bitmap of a room from its reservations and its state.
+
+        Args:
+            room_id (str): Room id
+
+        Returns:
+            int: Bitmap of the nights the room is taken
+        """
+        bits = 0
+        calendar = self._room_calendar.get(room_id, ())
+        # Reservations arriving after the horizon have no bits
+        horizon_end = self._horizon_start + datetime.timedelta(
+            days=self.horizon)
+        for arrival, departure, _ in calendar[:bisect.bisect_left(
+                calendar, (horizon_end, ))]:
+            bits |= self._night_mask(arrival, departure)
+        if self.rooms[room_id].state == "occupied":
+            bits |= 1
+        return bits
+
+    def _update_tonight(self, room_id: str):
+        """
+        Sets or clears the bit of tonight after the state of a room changed.
+        Only that bit is touched, one bisect in the reservations of the room.
+
+        Args:
+            room_id (str): Room id
+        """
+        if room_id not in self.rooms:
+            return
+        today = self._horizon_start
+        if (self.rooms[room_id].state == "occupied"
+                or not self._is_free(room_id, today,
+                                     today + datetime.timedelta(days=1))):
+            self._night_bitmaps[room_id] = self._night_bitmaps.get(room_id,
+                                                                   0) | 1
+        else:
+            self._night_bitmaps[room_id] = self._night_bitmaps.get(room_id,
+                                                                   0) & ~1
+
+    def _build_night_bitmaps(self):
+        """
+        Rebuilds the bitmaps of all rooms, the horizon starts today.
+        """
+        self._horizon_start = datetime.date.today()
+        self._night_bitmaps = {
+            room_id: self._room_nights(room_id)
+            for room_id in self.rooms
+        }
+
+    def _roll_horizon(self):
+        """
+        Moves the horizon to start today, the bitmaps are rebuilt once a day.
+        """
+        if self._horizon_start != datetime.date.today():
+            self._build_night_bitmaps()
+
+    def _build_reservation_index(self):
+        """
+        Rebuilds the room calendars and the reservations of each guest.
+        """
+        self._room_calendar = {}
+        self._reservations_by_ssn = {}
+        for reservation_id, reservation in self.reservations.items():
+            self._room_calendar.setdefault(reservation.room, []).append(
+                (reservation.arrival, reservation.departure, reservation_id))
+            self._reservations_by_ssn.setdefault(reservation.ssn,
+                                                 set()).add(reservation_id)
+        for calendar in self._room_calendar.values():
+            calendar.sort()
+        self._build_night_bitmaps()
+
+    def _index_reservation(self, reservation_id: str):
+        """
+        Adds a reservation to the calendar of its room and to its guest.
+
+        Args:
+            reservation_id (str): Reservation id
+        """
+        reservation = self.reservations[reservation_id]
+        bisect.insort(self._room_calendar.setdefault(reservation.room, []),
+                      (reservation.arrival, reservation.departure,
+                       reservation_id))
+        self._night_bitmaps[reservation.room] = self._night_bitmaps.get(
+            reservation.room, 0) | self._night_mask(reservation.arrival,
+                                                    reservation.departure)
+        self._reservations_by_ssn.setdefault(reservation.ssn,
+                                             set()).add(reservation_id)
+
+    def _unindex_reservation(self, reservation_id: str):
+        """
+        Removes a reservation from the calendar of its room and from its guest.
+
+        Args:
+            reservation_id (str): Reservation id
+        """
+        reservation = self.reservations[reservation_id]
+        calendar = self._room_calendar.get(reservation.room, [])
+        entry = (reservation.arrival, reservation.departure, reservation_id)
+        position = bisect.bisect_left(calendar, entry)
+        if position < len(calendar) and calendar[position] == entry:
+            del calendar[position]
+            if not calendar:
+                del self._room_calendar[reservation.room]
+        if reservation.room in self._night_bitmaps:
+            # Reservations never share a night, only an active booking can share tonight
+            self._night_bitmaps[reservation.room] &= ~self._night_mask(
+                reservation.arrival, reservation.departure)
+            self._update_tonight(reservation.room)
+        if (reservation_ids :=
+                self._reservations_by_ssn.get(reservation.ssn)) is not None:
+            reservation_ids.discard(reservation_id)
+            if not reservation_ids:
+                del self._reservations_by_ssn[reservation.ssn]
+
+    # Operators of query conditions, {"field": (operator, operand)}
+    QUERY_OPERATORS = {
+        "==": operator.eq,
+        "!=": operator.ne,
+        "<": operator.lt,
+        "<=": operator.le,
+        ">": operator.gt,
+        ">=": operator.ge,
+        # Field value is one of the operand values
+        "in": lambda value, operand: value in operand,
+        # Field (a list, misc for example) contains the operand
+        "has": lambda value, operand: operand in value,
+    }
+
+    def query(self,
+              collection: str,
+              where: dict | list[dict] | None = None,
+              inverted: bool = False,
+              sort_by: str = "",
+              descending: bool = False,
+              limit: int = 0) -> dict[str, dict]:
+        """
+        Returns the records of a collection that match the conditions in where.
+        Conditions on indexed fields (state, price and capacity of rooms) are looked up in the indexes,
+        only the remaining conditions are checked record by record.
+        Operands of numeric fields are parsed like the field, a price as "50.00" or int cents.
+
+        Example, vacant rooms for 3 or more under 50.00, cheapest first:
+            hotel.query("rooms", {"state": "vacant", "capacity": (">=", 3),
+                                  "price": ("<", "50.00")}, sort_by="price")
+
+        Args:
+            collection (str): "users", "rooms", "active", "old" or "reservations"
+            where (dict | list[dict] | None, optional): A dict of conditions that all must match,
+                                    field: value for equality or field: (operator, operand),
+                                    see QUERY_OPERATORS. A list of such dicts matches if any of
+                                    them does. Defaults to None (everything).\n
+            inverted (bool, optional): Return the records that do NOT match. Defaults to False.
+            sort_by (str, optional): Field to sort by. Defaults to "" (key order).
+            descending (bool, optional): Sort in descending order. Defaults to False.
+            limit (int, optional): Maximum amount of records, 0 for all. Defaults to 0.
+
+        Raises:
+            ValueError: Unknown collection or operator, or an invalid number
+
+        Returns:
+            dict[str, dict]: key (room id or ssn) -> record, in sorted order
+        """
+        if collection not in RECORDS:
+            raise ValueError(f"Unknown collection: {collection}")
+        branches = self._compile_where(where, collection)
+        data = getattr(self, collection)
+
+        candidates = None if inverted else self._query_candidates(
+            collection, branches)
+        if candidates is not None:
+            # Only the records found in the indexes, the rest of the conditions are checked below
+            items = ((key, data[key]) for key in sorted(candidates, key=int))
+        elif collection == "old" and self.archive:
+            items = self.old.iter_items()  # type: ignore
+        else:
+            items = iter(data.items())
+
+        # One pass, inverted is the complement of the matches
+        matches = ((key, record) for key, record in items
+                   if self._matches(record, branches) != inverted)
+        if sort_by:
+
+            def sort_key(item):
+                return item[1].get(sort_by)
+
+            if limit:
+                pick = heapq.nlargest if descending else heapq.nsmallest
+                matches = pick(limit, matches, key=sort_key)
+            else:
+                matches = sorted(matches, key=sort_key, reverse=descending)
+        elif descending:
+            matches = reversed(list(matches))
+
+        result: dict[str, dict] = {}
+        for key, record in matches:
+            result[key] = record
+            if limit and len(result) >= limit:
+                break
+        return result
 
-        total_reg += 1
-        self.old[ssn]["total registrations"] = str(total_reg)
+    def _compile_where(
+        self,
+        where: dict | list[dict] | None,
+        collection: str = "",
+    ) -> list[list[tuple[str, str, Any]]]:
+        """
+        Converts query conditions to a list of branches (any must match), each a list of
+        (field, operator, operand) that all must match.
 
-        del self.users[ssn]
+        Args:
+            where (dict | list[dict] | None): Conditions, see query
+            collection (str, optional): Collection queried, operands of its numeric fields
+                                    are parsed. Defaults to "" (operands as given).
 
-        self._update_json()
-        return True
+        Raises:
+            ValueError: Unknown operator, or an operand that is not a valid number
 
-    def check_in(self, ssn: str) -> bool:
+        Returns:
+            list[list[tuple[str, str, Any]]]: Branches of conditions
         """
-        Called when user is trying to check in to hotel
+        if not where:
+            return [[]]
+        numeric = RECORDS[collection].PARSE if collection else {}
+        branches = []
+        for conditions in (where if isinstance(where, list) else [where]):
+            branch = []
+            for field, condition in conditions.items():
+                op, operand = (condition if isinstance(condition, tuple) else
+                               ("==", condition))
+                if op not in self.QUERY_OPERATORS:
+                    raise ValueError(f"Unknown operator: {op}")
+                if field in numeric and op != "has":
+                    parse = numeric[field]
+                    operand = ([parse(value) for value in operand]
+                               if op == "in" else parse(operand))
+                branch.append((field, op, operand))
+            branches.append(branch)
+        return branches
+
+    def _matches(self, record: dict,
+                 branches: list[list[tuple[str, str, Any]]]) -> bool:
+        """
+        Returns True if the record matches any branch of compiled conditions.
 
         Args:
-            ssn (str): ssn of user wanting to check in
+            record (dict): A user, room, booking or history entry
+            branches (list[list[tuple[str, str, Any]]]): Result of _compile_where
 
         Returns:
-            bool: Boolean on success or failure
+            bool: True on match
         """
-        if not self.is_ssn_valid(ssn):
-            return False
-
-        # Checks if user exists
-        if self.is_registered(ssn):
-            # Check if already booked
-            if self.is_booked(ssn):
-                # Check if not checked in
-                if not self.active[ssn]["checked_in"]:
-                    # Good to check in...
-                    self.active[ssn]["checked_in"] = True
-                    self._update_json()
-                    return True
-        # If the controlstructure failed, returns False.
+        for branch in branches:
+            for field, op, operand in branch:
+                try:
+                    if not self.QUERY_OPERATORS[op](record.get(field), operand):
+                        break
+                except TypeError:
+                    # Not comparable (missing field or text with a number), not a match
+                    break
+            else:
+                return True
         return False
 
-    def check_out(self, ssn: str, unregister: bool) -> bool:
+    def _query_candidates(
+            self, collection: str,
+            branches: list[list[tuple[str, str, Any]]]) -> set[str] | None:
         """
-        Called when user is trying to check out to hotel
+        Looks up the keys that can match the conditions in the secondary indexes.
 
         Args:
-            ssn (str): ssn of user wanting to check out
-            unregister (bool): Boolean on whether to unregister user or not
+            collection (str): "users", "rooms", "active", "old" or "reservations"
+            branches (list[list[tuple[str, str, Any]]]): Result of _compile_where
 
         Returns:
-            bool: Boolean on success or failure
+            set[str] | None: Keys that can match, None if some branch has no indexed
+                                    condition (all records must be checked)
         """
-        if not self.is_ssn_valid(ssn):
-            return False
-
-        # Check if user exists and is booked
-        if self.is_registered(ssn) and self.is_booked(ssn):
-            # Check if checked in
-            if self.active[ssn]["checked_in"]:
-                # Good to check out...
-                booked_room_index = int(self.active[ssn]["room"]) - 1
-                self.rooms[booked_room_index]["user"] = ""
-                self.rooms[booked_room_index]["message"] = ""
-                self.rooms[booked_room_index]["state"] = "vacant"
-
-                self.active[ssn]["checked_in"] = False
-
-                # Remove booking from active dict
-                del self.active[ssn]
-                if unregister:
-                    self.unregister_user(ssn)
-                # Update json_data
-                self._update_json()
-                return True
-        # If the controlstructure failed, returns False.
-        return False
-
-    def add_booking(self,
-                    ssn: str,
-                    room: str,
-                    message: str = "",
-                    _override_is_booked=False) -> bool:
+        candidates: set[str] = set()
+        for branch in branches:
+            found = [
+                keys for field, op, operand in branch
+                if (keys := self._indexed_keys(collection, field, op, operand))
+                is not None
+            ]
+            if not found:
+                return None
+            # Intersect starting from the smallest set
+            found.sort(key=len)
+            candidates |= found[0].intersection(*found[1:])
+        return candidates
+
+    def _indexed_keys(self, collection: str, field: str, op: str,
+                      operand: Any) -> set[str] | None:
         """
-        Called when user is booking a room. Must be registered to add booking.
+        Returns the keys that match a single condition according to an index.
 
         Args:
-            ssn (str): ssn of user\n
-            room (str): room number(digits): "1", "2", "3" etc.
-            message (str, optional): message from user. Defaults to "".
-            _override_is_booked (bool, optional): Overrides the check for already book 
-            (use with precaution). Defaults to False.
+            collection (str): "users", "rooms", "active", "old" or "reservations"
+            field (str): Field of the condition
+            op (str): Operator of the condition
+            operand (Any): Operand of the condition
 
         Returns:
-            bool: Boolean on success or failure
+            set[str] | None: Matching keys, None if there is no index for the condition
         """
+        if collection == "rooms" and field == "state":
+            if op == "==":
+                return self._rooms_by_state.get(operand, set())
+            if op == "in":
+                return set().union(*(self._rooms_by_state.get(state, ())
+                                     for state in operand))
+        if (collection == "rooms" and field in ("price", "capacity")
+                and op in ("==", "<", "<=", ">", ">=")):
+            keys = set()
+            for (_, capacity), prices in self._room_prices.items():
+                if field == "capacity":
+                    if self.QUERY_OPERATORS[op](capacity, operand):
+                        keys.update(str(room_id) for _, room_id in prices)
+                    continue
+                # Rooms with the price itself are between (price, -inf) and (price, inf)
+                low = bisect.bisect_left(prices, (operand, float("-inf")))
+                high = bisect.bisect_right(prices, (operand, float("inf")))
+                start, end = {
+                    "==": (low, high),
+                    "<": (0, low),
+                    "<=": (0, high),
+                    ">": (high, len(prices)),
+                    ">=": (low, len(prices)),
+                }[op]
+                keys.update(str(room_id) for _, room_id in prices[start:end])
+            return keys
+        if collection == "rooms" and field == "misc" and op == "has":
+            return self.amenities.rooms.get(operand, set())
+        return None
 
-        if not self.is_ssn_valid(ssn):
-            return False
+    def filter_dict(
+        self,
+        data: Collection[dict] | Mapping[str, dict],
+        filter_: dict | None = None,
+        inverted: bool = False,
+    ) -> list[dict] | Collection[dict]:
+        """Returns a list of all filtered matches depending on given filter.
+        Kept for compatibility, query() is faster on the hotel's own collections.
 
-        # Checks if user exists and NOT already booked
+        Args:
+            data (Collection[dict] | Mapping[str, dict]): Records, or a collection like
+                                    hotel.rooms whose values are the records
+            filter_ (dict, optional): A dict where every key is going to be matched with
+                                    similar key and compare value to value, conditions
+                                    as in query() are also accepted. Defaults to None.\n
+            inverted (bool, optional): Ability to invert results. Defaults to False.
 
-        if self.is_registered(ssn):
-            if not self.is_booked(ssn) or _override_is_booked:
-                if room.isdigit():
-                    # Convert to int and move one step back for correct indexing
-                    room_index = int(room) - 1
-                    # Check if room is in range
-                    if 0 <= room_index < len(self.rooms):
-                        #  Check if room is vacant
-                        if self.rooms[room_index]["state"] == "vacant":
-                            # Change room state to occupied
-                            self.rooms[room_index]["state"] = "occupied"
-                            self.rooms[room_index]["user"] = ssn
-                            self.rooms[room_index]["message"] = message
-                            # Add booking to active dict
-                            self.active[ssn] = {
-                                "room": room,
-                                "checked_in": False
-                            }
-                            # Update json_data
-                            self._update_json()
-                            return True
-        # If the controlstructure failed, returns False.
-        return False
+        Raises:
+            ValueError: Unknown operator, or an operand that is not a valid number
 
-    def is_booked(self, ssn: str) -> bool:
+        Returns:
+            list[dict] | list: A list of filtered matches or all the matches if no filter is given.
         """
-        Returns a boolean depending on whether a user is booked or not.
+        if isinstance(data, Mapping):
+            data = list(data.values())
+        # Check if filter_ is provided (underscore is to avoid naming conflict)
+        if filter_:
+            # Operands are parsed like in query() when the records are the hotel's own
+            first = next(iter(data), None)
+            collection = next((name for name, record in RECORDS.items()
+                               if isinstance(first, record)), "")
+            branches = self._compile_where(filter_, collection)
+            # One pass for both normal and inverted results
+            return [
+                value for value in data
+                if self._matches(value, branches) != inverted
+            ]
+        else:
+            # If no filter was given, return data (all)
+            return data
+
+    # Fields of each kind of record for import_data, in csv column order
+    IMPORT_FIELDS = {
+        "users": ("ssn", "name", "age"),
+        "rooms":
+        ("name", "price", "capacity", "state", "description", "misc"),
+        "bookings": ("ssn", "room", "message"),
+    }
+
+    def import_data(self,
+                    path: str,
+                    kind: str,
+                    strict: bool = False) -> tuple[int, list[str]]:
+        """
+        Imports users, rooms or bookings from a csv (with header row) or json lines file.
+        The file is read one record at a time and everything is committed as one transaction.
+        In csv files misc is separated by ";".
 
         Args:
-            ssn (str): SSN of user
+            path (str): Path to a .csv or .jsonl file
+            kind (str): "users", "rooms" or "bookings", see IMPORT_FIELDS for the fields
+            strict (bool, optional): Import nothing if any record is invalid. Defaults to False.
+
+        Raises:
+            ValueError: Unknown kind, or invalid records when strict
 
         Returns:
-            bool: True if a user is booked, False otherwise
+            tuple[int, list[str]]: Amount of imported records and an error message per skipped record
         """
-        return ssn in self.active
+        if kind not in self.IMPORT_FIELDS:
+            raise ValueError(f"Unknown kind of record: {kind}")
+
+        imported = 0
+        errors: list[str] = []
+        with self.transaction():
+            for line, record in self._read_records(path):
+                if error := self._import_record(kind, record):
+                    errors.append(f"Line {line}: {error}")
+                else:
+                    imported += 1
+            if strict and errors:
+                # Rolls back the whole import
+                raise ValueError("Import failed, " + "; ".join(errors[:10]))
 
-    def remove_booking(self, ssn: str, unregister: bool) -> bool:
+        # A large import is one huge journal record, start over from a snapshot instead
+        if self.journal and imported >= self.journal_limit:
+            self.checkpoint()
+        return imported, errors
+
+    @staticmethod
+    def _read_records(path: str):
         """
-        Called when user is trying to remove a booking. Must be registered to remove booking.
+        Reads records one at a time from a .csv or .jsonl file.
 
         Args:
-            ssn (str): _description_
-            unregister (bool): unregister the user when removing booking
+            path (str): Path to the file
 
-        Returns:
-            bool: _description_
+        Yields:
+            tuple[int, dict | None]: Line number and record, None if the line is not valid json
         """
-        if not self.is_ssn_valid(ssn):
-            return False
-
-        # Check if user exists and is booked
-        if self.is_registered(ssn) and self.is_booked(ssn):
-            # Check if not checked in
-            if not self.active[ssn]["checked_in"]:
-                # Change room state to vacant
-                booked_room_index = int(self.active[ssn]["room"]) - 1
-                # Remove rooms user and message
-                self.rooms[booked_room_index]["state"] = "vacant"
-                self.rooms[booked_room_index]["user"] = ""
-                self.rooms[booked_room_index]["message"] = ""
-
-                # Remove booking from active dict
-                del self.active[ssn]
-                if unregister:
-                    # Unregister user
-                    if not self.unregister_user(ssn):
-                        # Failed un-registration
-                        return False
-                # Update json_data
-                self._update_json()
-                return True
-        # If the controlstructure failed, returns False.
-        return False
+        with open(path, newline="") as f:
+            if path.endswith(".csv"):
+                reader = csv.DictReader(f)
+                for record in reader:
+                    yield reader.line_num, record
+            else:
+                for line, text in enumerate(f, 1):
+                    if not text.strip():
+                        continue
+                    try:
+                        yield line, json.loads(text)
+                    except json.JSONDecodeError:
+                        yield line, None
 
-    def _change_room_state(self,
-                           room_number: str,
-                           state: str = "vacant") -> tuple[str, str] | bool:
+    def _import_record(self, kind: str, record: dict | None) -> str:
         """
-        Manually change rooms state, private method as it is supposed to only 
-        be called when editing a booking.
+        Validates and adds a single imported record.
 
         Args:
-            room_number (str): Room number, (not index)
-            state (str, optional): What state (optional incase further implementation). Defaults to "vacant".
+            kind (str): "users", "rooms" or "bookings"
+            record (dict | None): Fields of the record
 
         Returns:
-            bool: True on success, else False
+            str: Error message, empty on success
+        """
+        if not isinstance(record, dict):
+            return "Not a valid record"
+        # Json lines can have numbers, the hotel stores strings
+        fields = {
+            field: record.get(field) or ""
+            for field in self.IMPORT_FIELDS[kind]
+        }
+        for field, value in fields.items():
+            if field != "misc":
+                fields[field] = str(value).strip()
+
+        if kind == "users":
+            if not self.is_ssn_valid(fields["ssn"]):
+                return "Invalid ssn"
+            if not fields["name"]:
+                return "Name is missing"
+            if not fields["age"].isdigit():
+                return "Age must be a number"
+            result = self.register_user(fields["ssn"], fields["name"],
+                                        fields["age"])
+            return result if isinstance(result, str) else ""
+
+        if kind == "rooms":
+            if not fields["name"]:
+                return "Name is missing"
+            # Same rule as add_room, at most two decimals
+            try:
+                parse_price(fields["price"])
+            except ValueError:
+                return "Price must be a number with at most two decimals"
+            if not fields["capacity"].isdigit():
+                return "Capacity must be a number"
+            misc = fields["misc"]
+            if isinstance(misc, str):
+                misc = [value.strip() for value in misc.split(";") if value.strip()]
+            if not self.add_room(fields["name"], fields["price"],
+                                 fields["capacity"], fields["state"] or "vacant",
+                                 fields["description"], list(misc)):
+                return "Room could not be added"
+            return ""
+
+        if not self.is_ssn_valid(fields["ssn"]):
+            return "Invalid ssn"
+        if not self.add_booking(fields["ssn"], fields["room"],
+                                fields["message"]):
+            return "Booking failed, user must be registered and not booked, room must be vacant"
+        return ""
+
+    # Columns of each collection for export_rows/export_data
+    EXPORT_FIELDS = {
+        "users": ("ssn", "name", "age"),
+        "rooms": ("room", "name", "price", "capacity", "state", "description",
+                  "misc", "user", "message"),
+        "active": ("ssn", "room", "checked_in"),
+        "old": ("ssn", "name", "age", "total registrations"),
+        "reservations":
+        ("reservation", "ssn", "room", "arrival", "departure", "message"),
+    }
+
+    def export_rows(self, collection: str):
         """
+        Yields a collection one flat row at a time, nothing is copied up front.
+        The hotel should not be changed while the rows are being read.
 
-        if room_number.isdigit():
-            # Convert to int and move one step back for correct indexing
-            room_index = int(room_number) - 1
-            # Check if room is in range
-            if 0 <= room_index < len(self.rooms):
-                # Manually change state (note it does not care about user or message):
-                self.rooms[room_index]["state"] = state
-                message = str(self.rooms[room_index]["message"])
-                ssn = str(self.rooms[room_index]["user"])
+        Args:
+            collection (str): "users", "rooms", "active", "old" or "reservations"
 
-                # Unset message and user
-                self.rooms[room_index]["message"] = ""
-                self.rooms[room_index]["user"] = ""
+        Raises:
+            ValueError: Unknown collection
 
-                # Update json_data
-                self._update_json()
-                return (message, ssn)
-        return False
+        Yields:
+            dict: Row with the columns in EXPORT_FIELDS[collection]
+        """
+        if collection not in self.EXPORT_FIELDS:
+            raise ValueError(f"Unknown collection: {collection}")
+
+        # Rows are formatted the same as stored, numbers as strings
+        if collection == "rooms":
+            for room_id, room in self.rooms.items():
+                yield {"room": room_id, **room.to_json()}
+        elif collection == "reservations":
+            for reservation_id, reservation in self.reservations.items():
+                yield {"reservation": reservation_id, **reservation.to_json()}
+        elif collection == "old" and self.archive:
+            # Read from the archive one bucket at a time
+            for ssn, entry in self.old.iter_items():  # type: ignore
+                yield {"ssn": ssn, **entry.to_json()}
+        else:
+            for ssn, entry in getattr(self, collection).items():
+                yield {"ssn": ssn, **entry.to_json()}
 
-    def edit_booking(self, ssn: str, new_room: str = "", message: str = ""):
+    def export_data(self, path: str, collection: str) -> int:
         """
-        Called when user is trying to edit a booking. Must be registered to edit booking.
+        Writes a collection to a csv or json lines file, one row at a time.
+        In csv files misc is separated by ";", the same as import_data.
 
         Args:
-            ssn (str): SSN of user
-            new_room (str, optional): If wished to swap room. Defaults to "".
-            message (str, optional): Messages, can be passed alone or with new_room. Defaults to "".
+            path (str): Path to a .csv or .jsonl file
+            collection (str): "users", "rooms", "active", "old" or "reservations"
 
         Returns:
-            bool: True if successful, False otherwise
+            int: Amount of exported rows
         """
-        if not self.is_ssn_valid(ssn):
-            return False
-
-        if self.is_registered(ssn) and self.is_booked(ssn):
-            if new_room:
-                if new_room.isdigit():
-                    old_room = str(self.active[ssn]["room"])
-                    # Change room state to vacant, returns message and ssn
-                    if type(result := self._change_room_state(
-                            old_room)) == tuple:
-                        old_message, old_ssn = result  # type: ignore
-                        if (self.add_booking(old_ssn,
-                                             new_room,
-                                             old_message,
-                                             _override_is_booked=True)):
+        rows = 0
+        with open(path, "w", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.DictWriter(f, self.EXPORT_FIELDS[collection])
+                writer.writeheader()
+                for row in self.export_rows(collection):
+                    if "misc" in row:
+                        row["misc"] = ";".join(row["misc"])
+                    writer.writerow(row)
+                    rows += 1
+            else:
+                for row in self.export_rows(collection):
+                    f.write(json.dumps(row) + "\n")
+                    rows += 1
+        return rows
 
-                            self._update_json()
-                            return True
-            elif message:
-                booked_room = int(self.active[ssn]["room"]) - 1
-                self.rooms[booked_room]["message"] = message
-                self._update_json()
-                return True
-        return False
+    def _pretty_print(self):
+        # Unimplemented, intended for debugging only...
+        raise NotImplementedError
 
-    def add_room(
-        self,
-        name: str,
-        price: str,
-        capacity: str,
-        state: str,
-        description: str,
-        misc: list[str],
-    ) -> bool:
+    def _mark_dirty(self, collection: str, key: str | None = None):
         """
-        Adds a room to the hotel.
+        Marks a collection, or a single key in it, as changed since the last flush.
+        Called right before the change is made.
 
         Args:
-            name (str): Name of the room, example: JuniorSuite\n
-            price (str): Price per night, example: 19.99\n
-            capacity (str): How many can fit? example: 2\n
-            state (str): State of the room, example: vacant or occupied\n
-            description (str): A short description, who its fitted for\n
-            misc (list[str]): list of additional information, example: wifi, type of bed, etc.\n
+            collection (str): "users", "rooms", "active", "old" or "reservations"
+            key (str | None, optional): Changed key (ssn or room number), None for the
+                                    whole collection. Defaults to None.
+        """
+        self._changed = True
+        if self._undo is not None and (collection, key) not in self._undo_keys:
+            # First change of this key in the transaction, keep a copy for rollback
+            self._undo_keys.add((collection, key))
+            previous = (getattr(self, collection)
+                        if key is None else self._get_entry(collection, key))
+            if previous is not _MISSING:
+                previous = copy.deepcopy(previous)
+            self._undo.append((collection, key, previous))
+
+        if collection == "old" and self.archive:
+            # The archive keeps track of its own changes
+            self.old.mark_dirty(key)  # type: ignore
+            return
+        if key is None:
+            self._dirty[collection] = None
+        elif (keys := self._dirty.setdefault(collection, set())) is not None:
+            keys.add(key)
 
-        Returns:
-            bool: True if operation was successful, False otherwise
+    def _commit(self, op: str, args: tuple, kwargs: dict):
         """
-        user: str = ""
-        message: str = ""
-        self.rooms.append({
-            "name": name,
-            "price": price,
-            "capacity": capacity,
-            "state": state,
-            "description": description,
-            "misc": misc,
-            "user": user,
-            "message": message,
-        })
-        self._update_json()
-        return True
+        Registers a finished change and flushes according to the flush policy.
 
-    def remove_room(self, room_nr: str) -> bool:
+        Args:
+            op (str): Name of the HotelManager method that was called
+            args (tuple): Positional arguments of the call
+            kwargs (dict): Keyword arguments of the call
+        """
+        if self._undo is not None:
+            # Committed together with the transaction
+            if self.journal:
+                self._transaction_records.append({
+                    "op": op,
+                    "args": copy.deepcopy(list(args)),
+                    "kwargs": copy.deepcopy(kwargs)
+                })
+            return
+
+        if self.journal:
+            self._seq += 1
+            self._pending_records.append({
+                "seq": self._seq,
+                "date": datetime.date.today().isoformat(),
+                "op": op,
+                "args": list(args),
+                "kwargs": kwargs
+            })
+        self._pending += 1
+        self._apply_flush_policy()
+
+    def _apply_flush_policy(self):
+        """
+        Flushes if enough changes are pending, otherwise makes sure the flush timer is running.
+        """
+        if self.flush_every and self._pending >= self.flush_every:
+            self.flush()
+        elif self.flush_interval and self._timer is None:
+            # Flush from a background timer in case no more changes comes in
+            self._timer = threading.Timer(self.flush_interval / 1000,
+                                          self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _get_entry(self, collection: str, key: str) -> Any:
         """
-        Removes a room from the hotel.
+        Returns the value of a key in a collection, _MISSING if it doesn't exist.
 
         Args:
-            room_nr (str): Room nr (index in room list + 1)
+            collection (str): "users", "rooms", "active", "old" or "reservations"
+            key (str): ssn or room number
 
         Returns:
-            bool: True if operation was successful, False otherwise
+            Any: The stored value or _MISSING
         """
-        if room_nr.isdigit():
-            room_index = int(room_nr) - 1
-            if 0 <= room_index < len(self.rooms):
-                # Check if room is booked, handle accordingly
-                if self.rooms[room_index]["user"]:
-                    self.remove_booking(
-                        self.rooms[room_index]["user"],  # type: ignore
-                        unregister=False)
-
-                del self.rooms[room_index]
-                self._update_json()
-                return True
-        return False
+        return getattr(self, collection).get(key, _MISSING)
 
-    def edit_room(
-        self,
-        room_id: str,
-        name: str = "",
-        price: str = "",
-        capacity: str = "",
-        state: str = "",
-        description: str = "",
-        misc: list[str] = [],
-    ):
+    def _set_entry(self, collection: str, key: str, value: Any):
         """
-        Edits a room in the hotel. Only the fields that are not empty will change.
+        Sets (or removes if value is _MISSING) a key in a collection.
 
         Args:
-            room_id (_type_): Room ID (index in room list + 1)
-            name (str): Name of the room, example: JuniorSuite\n
-            price (str): Price per night, example: 19.99\n
-            capacity (str): How many can fit? example: 2\n
-            state (str): State of the room, example: vacant or occupied\n
-            description (str): A short description, who its fitted for\n
-            misc (list[str]): list of additional information, example: wifi, type of bed, etc.\n
+            collection (str): "users", "rooms", "active", "old" or "reservations"
+            key (str): ssn or room number
+            value (Any): Value to store or _MISSING
         """
-        if room_id.isdigit():
-            room_index = int(room_id) - 1
-            if 0 <= room_index < len(self.rooms):
-                if name:
-                    self.rooms[room_index]["name"] = name
-                if price:
-                    self.rooms[room_index]["price"] = price
-                if capacity:
-                    self.rooms[room_index]["capacity"] = capacity
-                if state:
-                    self.rooms[room_index]["state"] = state
-                if description:
-                    self.rooms[room_index]["description"] = description
-                if misc:
-                    self.rooms[room_index]["misc"] = misc
-                self._update_json()
-                return True
-        return False
+        data = getattr(self, collection)
+        if collection == "rooms" and key in data:
+            self._unindex_room(key)
+        if collection == "reservations" and key in data:
+            self._unindex_reservation(key)
+        if value is _MISSING:
+            data.pop(key, None)
+        else:
+            data[key] = value
+            if collection == "rooms":
+                self._index_room(key)
+            if collection == "reservations":
+                self._index_reservation(key)
+        if collection in ("users", "old"):
+            self._index_guest(key)
+        if collection == "active":
+            self._occupancy.unlink(key)
+            if value is not _MISSING:
+                self._occupancy.link(key, str(value.room))
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Groups changes into one commit, with hotel.transaction(): ...
+        Nothing is flushed until the block ends, and if it raises an exception
+        every change made in the block is rolled back. Nested transactions are part of the outermost.
 
-    def filter_dict(
-        self,
-        data: Collection[dict],
-        filter_: dict | None = None,
-        inverted: bool = False,
-    ) -> list[dict] | Collection[dict]:
-        """Returns a list of all filtered matches depending on given filter
+        Yields:
+            HotelManager: self
+        """
+        with self._lock:
+            if self._undo is not None:
+                yield self
+                return
 
-        Args:
-            filter_ (dict, optional): A dict of len == 1 where the key is going to be
-                                    matched with similar key and also compare value to value.
-                                    Defaults to None.\n
-            inverted (bool, optional): Ability to invert results. Defaults to False.
+            self._undo = []
+            self._undo_keys = set()
+            self._transaction_records = []
+            next_room_id = self._next_room_id
+            next_reservation_id = self._next_reservation_id
+            try:
+                yield self
+                if self.verify and self._undo:
+                    self._verify_changes()
+            except BaseException:
+                self._rollback()
+                # Replaying the journal must hand out the same room and reservation ids
+                self._next_room_id = next_room_id
+                self._next_reservation_id = next_reservation_id
+                raise
+            else:
+                changed = bool(self._undo)
+                records = self._transaction_records
+            finally:
+                self._undo = None
+                self._undo_keys = set()
+                self._transaction_records = []
+
+            if changed:
+                if self.journal and records:
+                    # One journal line, so a crash can't leave half a transaction
+                    self._seq += 1
+                    self._pending_records.append({
+                        "seq": self._seq,
+                        "date": datetime.date.today().isoformat(),
+                        "batch": records
+                    })
+                self._pending += 1
+                self._apply_flush_policy()
+
+    def _rollback(self):
+        """
+        Restores everything changed in the open transaction, most recent change first.
+        """
+        for collection, key, previous in reversed(self._undo or []):
+            if key is None:
+                setattr(self, collection, previous)
+                if collection == "rooms":
+                    self._build_room_index()
+                if collection == "reservations":
+                    self._build_reservation_index()
+                if collection in ("users", "old"):
+                    # Built again by the next guest search
+                    self._guests_indexed = False
+                if collection == "active":
+                    self._build_occupancy()
+            else:
+                self._set_entry(collection, key, previous)
 
-        Returns:
-            list[dict] | list: A list of filtered matches or all the matches if no filter is given.
+    def flush(self):
         """
-        # Check if filter_ is provided (underscore is to avoid naming conflict)
-        if filter_:
-            filtered: list = list()
-            # Gets first key in dict
-            filter_key = list(filter_.keys())[0]
-            for value in data:
-                if value[filter_key] == filter_[filter_key]:
-                    filtered.append(value)
+        Writes all pending changes to disk.
+        In journal mode the pending records are appended to the journal in one write,
+        otherwise a new snapshot is written.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+
+            if self.journal:
+                self.storage.append_journal(self._pending_records)
+                self._journal_size += len(self._pending_records)
+                self._pending_records = []
+                if self._journal_size >= self.journal_limit:
+                    self.checkpoint()
             else:
-                if inverted:
-                    # Returns the inverted list
-                    return [value for value in data if value not in filtered]
-                else:
-                    return filtered
-        else:
-            # If no filter was given, return data (all)
-            return data
+                self._write_snapshot(self._dirty)
+            self._dirty = {}
+            self._pending = 0
 
-    def _pretty_print(self):
-        # Unimplemented, intended for debugging only...
-        raise NotImplementedError
+    def close(self):
+        """
+        Flushes pending changes and closes the storage backend,
+        call before the HotelManager is discarded.
+        """
+        self.flush()
+        self.storage.close()
+
+    def __enter__(self):
+        return self
 
-    def _update_json(self):
+    def __exit__(self, *_):
+        self.close()
+
+    def _replay(self):
+        """
+        Replays journal records newer than the loaded snapshot.
         """
-        Updates data structure with new json_data and loads the new json_data
+        self._replaying = True
+        try:
+            for record in self.storage.read_journal():
+                # Records older than the snapshot are already part of it (crash before clear_journal)
+                if record["seq"] <= self._seq:
+                    continue
+                # Calls depending on tonight see the day they were made
+                self._replay_date = (parse_date(record["date"])
+                                     if "date" in record else None)
+                # A transaction is one record with a batch of calls
+                for call in record.get("batch", [record]):
+                    getattr(self, call["op"])(*call["args"], **call["kwargs"])
+                self._seq = record["seq"]
+        finally:
+            self._replaying = False
+            self._replay_date = None
+
+    def checkpoint(self):
         """
-        self.json_data["rooms"] = self.rooms
-        self.json_data["active"] = self.active
-        self.json_data["users"] = self.users
-        self.json_data["old"] = self.old
+        Writes the full state as a new snapshot and empties the journal.
+        """
+        with self._lock:
+            self._write_snapshot()
+            # Snapshot is written, the journal records are no longer needed
+            self.storage.clear_journal()
+            self._journal_size = 0
+            self._pending_records = []
+            self._dirty = {}
+            self._pending = 0
+
+    def export_storage(self, target: StorageInterface):
+        """
+        Writes the whole hotel to another storage backend, for example exporting a
+        binary snapshot as json: hotel.export_storage(JsonHandling("export.json"))
 
-        # Same practice as constructor
-        self.json_handler.pack_data(self.json_data)
-        self.json_data = self.json_handler.unpack_data()
+        Args:
+            target (StorageInterface): Backend to write to, existing content is replaced
+        """
+        with self._lock:
+            target.pack_data({
+                "users": _StorageView(self.users),
+                "rooms": _StorageView(self.rooms),
+                "active": _StorageView(self.active),
+                "old": _StorageView(self.old),
+                "reservations": _StorageView(self.reservations),
+                "next_room_id": self._next_room_id,
+                "next_reservation_id": self._next_reservation_id,
+            })
+
+    def _write_snapshot(self, dirty: dict | None = None):
+        """
+        Writes the in memory data structures to the storage backend.
 
-        self.users = (self.json_data["users"]
-                      if "users" in self.json_data else dict())
-        self.rooms = (self.json_data["rooms"]
-                      if "rooms" in self.json_data else list())
-        self.active = (self.json_data["active"]
-                       if "active" in self.json_data else dict())
-        self.old = self.json_data["old"] if "old" in self.json_data else dict()
+        Args:
+            dirty (dict | None, optional): Changed keys per collection, lets backends
+                                    write only those. None writes everything. Defaults to None.
+        """
+        # Records are converted back to the stored layout by the views, one by one
+        self.json_data["rooms"] = _StorageView(self.rooms)
+        self.json_data["active"] = _StorageView(self.active)
+        self.json_data["users"] = _StorageView(self.users)
+        self.json_data["old"] = _StorageView(self.old)
+        self.json_data["reservations"] = _StorageView(self.reservations)
+        self.json_data["next_room_id"] = self._next_room_id
+        self.json_data["next_reservation_id"] = self._next_reservation_id
+        if self.journal:
+            self.json_data["seq"] = self._seq
+
+        if self.archive:
+            # The archive is written first but only made current once the snapshot is written
+            self.json_data["old"] = dict()
+            archived = self.old.prepare(self._snapshot + 1)  # type: ignore
+            if archived:
+                self._snapshot += 1
+                self.json_data["snapshot"] = self._snapshot
+            self.storage.pack_data(self.json_data, dirty=dirty)
+            if archived:
+                self.old.commit()  # type: ignore
+        else:
+            self.storage.pack_data(self.json_data, dirty=dirty)
 
 
 class HotelInterface(metaclass=ABCMeta):
@@ -791,8 +4624,6 @@ class ConsoleHotel(HotelInterface):
         """
         # Main loop
         while True:
-            # Updates the hotels internal information
-            self.hotel._update_json()
             # Prints the menu and gets input
             user_input = self._print_menu(self._menu_option)
 
@@ -808,8 +4639,8 @@ class ConsoleHotel(HotelInterface):
                                                              1]]()
 
             elif user_input == self._menu_option["exit"]:
-                # Update json_data before exiting
-                self.hotel._update_json()
+                # Write pending changes before exiting
+                self.hotel.close()
                 # Exits the loop & program
                 break
 
@@ -847,6 +4678,7 @@ class ConsoleHotel(HotelInterface):
             "description": "User correlated actions",
             "options": {
                 "View all users": self._print_all_users,
+                "Search users": self._search_users,
                 "Register new user": self._register_user,
                 "Edit user": self._edit_user,
                 "Unregister user": self._unregister_user,
@@ -854,7 +4686,6 @@ class ConsoleHotel(HotelInterface):
             "exit": self._menu_option["exit"],
         }
         while True:
-            self.hotel._update_json()
             # Print menu and get input
             user_input = self._print_menu(self._menu_user_option)
             # Check if user wants to exit
@@ -863,7 +4694,7 @@ class ConsoleHotel(HotelInterface):
             # Check if user input is valid
             if user_input.isdigit() and int(user_input) in range(
                     1,
-                    len(self._menu_user_option) + 1):
+                    len(self._menu_user_option["options"]) + 1):
                 # Call the function associated with the option
                 self._menu_user_option["options"][list(
                     self._menu_user_option["options"].keys())[int(user_input) -
@@ -886,7 +4717,6 @@ class ConsoleHotel(HotelInterface):
             "exit": self._menu_option["exit"],
         }
         while True:
-            self.hotel._update_json()
             # Print menu and get input
             user_input = self._print_menu(self._menu_booking_option)
             # Check if user wants to exit
@@ -918,7 +4748,6 @@ class ConsoleHotel(HotelInterface):
             "exit": self._menu_option["exit"],
         }
         while True:
-            self.hotel._update_json()
             # Print menu and get input
             user_input = self._print_menu(self._menu_room_option)
             # Check if user wants to exit
@@ -973,20 +4802,19 @@ class ConsoleHotel(HotelInterface):
         """
         Prints all vacant rooms.
         """
-        # Gets all rooms that are vacant.
-        self.vacant_rooms = self.hotel.filter_dict(self.hotel.rooms,
-                                                   {"state": "vacant"})
+        # Gets all rooms that are vacant, with their ids.
+        self.vacant_rooms = self.hotel.rooms_in_state("vacant")
         self._clear_console()
         print(self._menu_option["header"])
         print("=" * len(self._menu_option["header"]))
         print(f"There are {len(self.vacant_rooms)} vacant rooms")
         print("-" * 15)
         # Print out all room information here
-        for room in self.vacant_rooms:
-            print(f"Room Number:  {self.hotel.rooms.index(room)+1}")
+        for room_id, room in self.vacant_rooms.items():
+            print(f"Room Number:  {room_id}")
             print(f"Type: {room['name']}")
             print(f"State: {room['state']}")
-            print(f"Price: {room['price']}c")
+            print(f"Price: {format_price(room['price'])}c")
             print(f"Capacity: {room['capacity']}")
             print(f"Description: {room['description']}")
             print(f"Features:", ", ".join(room["misc"]))
@@ -1016,6 +4844,8 @@ class ConsoleHotel(HotelInterface):
 
             if userSSN == self._menu_option["exit"]:
                 return
+            # Looked up directly below, under the stored key
+            userSSN = canonical_ssn(userSSN)
 
             if self.hotel.is_registered(userSSN):
                 self._userPrint("User already registered")
@@ -1103,6 +4933,8 @@ class ConsoleHotel(HotelInterface):
             self._userInput(
                 f"Invalid SSN (Make sure its 12 numbers and registered). Press enter to try again or {self._menu_option['exit']} to exit"
             )
+        # Looked up directly below, under the stored key
+        userSsn = canonical_ssn(userSsn)
 
         while True:
             name = self.hotel.users[userSsn]["name"]
@@ -1225,6 +5057,34 @@ class ConsoleHotel(HotelInterface):
 
         self._userInput("Press enter to continue...")
 
+    def _search_users(self):
+        self._clear_console()
+        print(self._menu_option["header"])
+        print("=" * len(self._menu_option["header"]))
+        print("Search users")
+        print("-" * 15)
+        # Digits are the start of an ssn, anything else the start of a name
+        search = self._userInput("Enter the start of a name or SSN: ")
+        if search == self._menu_option["exit"]:
+            return
+        if search.replace("-", "").replace(" ", "").isdigit():
+            found = self.hotel.find_users(ssn=search)
+        elif search.strip():
+            found = self.hotel.find_users(name=search)
+        else:
+            found = {}
+        print("-" * 15)
+        for index, (k, v) in enumerate(found.items()):
+            print(f"User {index+1}:")
+            print("SSN:", k)
+            print("Name:", v["name"])
+            print("Age:", v["age"])
+            print("-" * 15)
+        if not found:
+            print("No users found")
+
+        self._userInput("Press enter to continue...")
+
     def _add_booking(self):
         self._clear_console()
         print(self._menu_option["header"])
@@ -1257,10 +5117,7 @@ class ConsoleHotel(HotelInterface):
             if userRoom == "rooms":
                 self._print_all_vacant()
 
-            elif userRoom.isdigit() and int(userRoom) in range(
-                    1,
-                    len(self.hotel.rooms) + 1):
-                # Lowers the number by one step (index starts at 0)
+            elif userRoom in self.hotel.rooms:
                 break
             else:
                 self._userInput(
@@ -1359,10 +5216,12 @@ class ConsoleHotel(HotelInterface):
             self._userInput(
                 f"Invalid SSN (Make sure its 12 numbers and registered). Press enter to try again or {self._menu_option['exit']} to exit"
             )
+        # Looked up directly below, under the stored key
+        userSsn = canonical_ssn(userSsn)
 
         while True:
             booked_room = self.hotel.active[userSsn]["room"]
-            message = self.hotel.rooms[int(booked_room) - 1]["message"]
+            message = self.hotel.rooms[str(booked_room)]["message"]
             self._clear_console()
 
             print("What to edit?")
@@ -1424,7 +5283,7 @@ class ConsoleHotel(HotelInterface):
             print(f"Booking {index+1}:")
             print("SSN:", k)
             print("Room:", v["room"])
-            print("Message:", self.hotel.rooms[int(v["room"]) - 1]["message"])
+            print("Message:", self.hotel.rooms[str(v["room"])]["message"])
             print("-" * 15)
 
         self._userInput("Press enter to continue...")
@@ -1548,14 +5407,14 @@ class ConsoleHotel(HotelInterface):
             userNumber = self._userInput("Chose room number: ")
             if userNumber == self._menu_option["exit"]:
                 return
-            if userNumber.isdigit():
+            if userNumber in self.hotel.rooms:
                 break
             else:
                 self._userInput(
                     f"Invalid room number. Press enter to try again or {self._menu_option['exit']} to exit"
                 )
 
-        room = self.hotel.rooms[int(userNumber) - 1]
+        room = self.hotel.rooms[userNumber]
         roomName = room["name"]
 
         while True:
@@ -1596,14 +5455,14 @@ class ConsoleHotel(HotelInterface):
             userNumber = self._userInput("Chose room number: ")
             if userNumber == self._menu_option["exit"]:
                 return
-            if userNumber.isdigit():
+            if userNumber in self.hotel.rooms:
                 break
             else:
                 self._userInput(
                     f"Invalid room number. Press enter to try again or {self._menu_option['exit']} to exit"
                 )
 
-        room = self.hotel.rooms[int(userNumber) - 1]
+        room = self.hotel.rooms[userNumber]
         roomName = room["name"]
 
         while True:
@@ -1626,10 +5485,15 @@ class ConsoleHotel(HotelInterface):
             print(f"Editing room: {userNumber} - {room['name']}")
             print("With following current Information:")
             print("-" * 15)
-            for index, info in enumerate(room):
-                # Exclude keys, user and message
-                if info not in ["user", "message", "state"]:
-                    self._userPrint(f"[{index+1}] {info}: {room[info]}")
+            # Only fields edit_room accepts, the state follows bookings
+            fields = [
+                info for info in room
+                if info in ["name", "price", "capacity", "description", "misc"]
+            ]
+            for index, info in enumerate(fields):
+                value = (format_price(room[info])
+                         if info == "price" else room[info])
+                self._userPrint(f"[{index+1}] {info}: {value}")
             self._userPrint(f"[{self._menu_option['exit']}]: Exit")
             print("-" * 15)
             print()
@@ -1640,15 +5504,30 @@ class ConsoleHotel(HotelInterface):
 
             if userChoice.isdigit():
                 userChoice = int(userChoice) - 1
-                if userChoice in range(len(room)):
+                if userChoice in range(len(fields)):
                     userInput = self._userInput(
-                        f"Enter new {list(room.keys())[userChoice]}: ")
+                        f"Enter new {fields[userChoice]}: ")
                     # userInput = self._userInput(
                     #     f"Enter new {room[list(room.keys())[userChoice]]}: ")
                     if userInput == self._menu_option["exit"]:
                         pass
                     else:
-                        room[list(room.keys())[userChoice]] = userInput
+                        # Edit through the hotel so the change is stored (and journaled)
+                        key = fields[userChoice]
+                        if key == "misc":
+                            self.hotel.edit_room(
+                                userNumber,
+                                misc=[
+                                    misc.strip()
+                                    for misc in userInput.split(",")
+                                ])
+                        elif not self.hotel.edit_room(userNumber,
+                                                      **{key: userInput}):
+                            # Price and capacity must be numbers
+                            self._userInput(
+                                f"Invalid {key}. Press enter to try again or {self._menu_option['exit']} to exit"
+                            )
+                        room = self.hotel.rooms[userNumber]
                 else:
                     self._userInput(
                         f"Invalid choice. Press enter to try again or {self._menu_option['exit']} to exit"
@@ -1666,10 +5545,10 @@ class ConsoleHotel(HotelInterface):
         print("All Rooms")
         print("-" * 15)
 
-        for index, room in enumerate(self.hotel.rooms):
-            print(f"Room: {index+1}:")
+        for room_id, room in self.hotel.rooms.items():
+            print(f"Room: {room_id}:")
             print(f"Name: {room['name']}")
-            print(f"Price: {room['price']}")
+            print(f"Price: {format_price(room['price'])}")
             print(f"Capacity: {room['capacity']}")
             print(f"State: {room['state']}")
             print(f"Description: {room['description']}")
@@ -1774,5 +5653,50 @@ def _main():
             return
 
 
+def _cli(argv: list[str] | None = None):
+    """
+    Command line entry point, starts the console hotel when no command is given.
+    Example: python hotel.py import users guests.csv
+             python hotel.py export old history.jsonl
+
+    Args:
+        argv (list[str] | None, optional): Arguments, None uses sys.argv. Defaults to None.
+    """
+    parser = argparse.ArgumentParser(description="Nimbus Hotel")
+    parser.add_argument("--file",
+                        default="",
+                        help="name of the hotel json file (default hotel.json)")
+    commands = parser.add_subparsers(dest="command")
+
+    import_parser = commands.add_parser(
+        "import", help="bulk import records from a .csv or .jsonl file")
+    import_parser.add_argument("kind", choices=HotelManager.IMPORT_FIELDS)
+    import_parser.add_argument("path")
+    import_parser.add_argument("--strict",
+                               action="store_true",
+                               help="import nothing if any record is invalid")
+
+    export_parser = commands.add_parser(
+        "export", help="export a collection to a .csv or .jsonl file")
+    export_parser.add_argument("collection", choices=HotelManager.EXPORT_FIELDS)
+    export_parser.add_argument("path")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        _main()
+        return
+
+    with HotelManager(args.file) as hotel:
+        if args.command == "export":
+            rows = hotel.export_data(args.path, args.collection)
+            print(f"Exported {rows} {args.collection}")
+            return
+        imported, errors = hotel.import_data(args.path, args.kind,
+                                             args.strict)
+    for error in errors:
+        print(error)
+    print(f"Imported {imported} {args.kind}, skipped {len(errors)}")
+
+
 if __name__ == "__main__":
-    _main()
+    _cli()
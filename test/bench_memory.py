@@ -0,0 +1,103 @@
+"""
+Date: 18-10-2026
+Info: Memory used by a hotel with 200k guests in history ("old") and 1k rooms,
+    and by 10k rooms of one room type, kept as the stored dicts compared to
+    the record classes HotelManager uses.
+
+Run from the repository root: python test/bench_memory.py
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from hotel import HotelManager
+
+GUESTS = 200_000
+ROOMS = 1_000
+MANY_ROOMS = 10_000
+
+
+def make_payload(guests: int = GUESTS, rooms: int = ROOMS) -> str:
+    """
+    Creates a synthetic hotel as stored.
+
+    Args:
+        guests (int, optional): Guests in history. Defaults to GUESTS.
+        rooms (int, optional): Rooms, all of the same type. Defaults to ROOMS.
+
+    Returns:
+        str: The hotel in the json file layout
+    """
+    old = {}
+    for number in range(guests):
+        # Unique for the first 210 000 numbers
+        ssn = f"{1940 + number % 60}{number % 12 + 1:02d}{number % 28 + 1:02d}{number % 10000:04d}"
+        old[ssn] = {
+            "name": f"Guest {number}",
+            "age": str(18 + number % 70),
+            "total registrations": str(number % 9 + 1),
+        }
+    room_data = {str(number + 1): {
+        "name": "JuniorSuite",
+        "price": "19.99",
+        "capacity": "4",
+        "state": "vacant",
+        "description": "This is a room fitted for average income earners.",
+        "misc": ["2xDoubleBed", "wifi", "tv", "fridge", "microwave"],
+        "user": "",
+        "message": "",
+    } for number in range(rooms)}
+    return json.dumps({"rooms": room_data, "old": old})
+
+
+def measure(payload: str, records: bool) -> tuple[int, int, int]:
+    """
+    Loads the payload and measures the memory that stays allocated.
+
+    Args:
+        payload (str): Hotel in the json file layout
+        records (bool): Convert to record classes like HotelManager does
+
+    Returns:
+        tuple[int, int, int]: Bytes allocated, amount of history entries and of rooms
+    """
+    gc.collect()
+    tracemalloc.start()
+    data = json.loads(payload)
+    if records:
+        for collection in ("rooms", "old"):
+            HotelManager._load_collection(collection, data[collection])
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, len(data["old"]), len(data["rooms"])
+
+
+def bench():
+    payload = make_payload()
+    print(f"{GUESTS} guests in history, {ROOMS} rooms")
+    print(f"{'layout':<10}{'MB':>10}{'bytes/guest':>14}")
+    sizes = []
+    for name, records in (("dicts", False), ("records", True)):
+        size, guests, _ = measure(payload, records)
+        sizes.append(size)
+        print(f"{name:<10}{size / 2**20:>10.1f}{size / guests:>14.0f}")
+    print(f"Reduction: {1 - sizes[1] / sizes[0]:.0%}")
+
+    # Identical rooms share one RoomType
+    payload = make_payload(0, MANY_ROOMS)
+    print(f"\n{MANY_ROOMS} rooms of one type")
+    print(f"{'layout':<10}{'MB':>10}{'bytes/room':>14}")
+    sizes = []
+    for name, records in (("dicts", False), ("records", True)):
+        size, _, rooms = measure(payload, records)
+        sizes.append(size)
+        print(f"{name:<10}{size / 2**20:>10.1f}{size / rooms:>14.0f}")
+    print(f"Reduction: {1 - sizes[1] / sizes[0]:.0%}")
+
+
+if __name__ == "__main__":
+    bench()
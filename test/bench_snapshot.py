@@ -0,0 +1,83 @@
+"""
+Date: 18-10-2026
+Info: Benchmark of loading and saving a hotel with 100k guests,
+    json file (JsonHandling) compared to binary snapshot (BinaryHandling).
+
+Run from the repository root: python test/bench_snapshot.py
+Files are written to src/json as bench_snapshot.* and removed afterwards.
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from hotel import BinaryHandling, HotelManager, JsonHandling
+
+GUESTS = 100_000
+ROOMS = 1_000
+REPEATS = 3
+
+
+def make_hotel() -> dict:
+    """
+    Creates a synthetic hotel, half of the guests registered and half in history.
+
+    Returns:
+        dict: Hotel in the json file layout
+    """
+    users = {}
+    old = {}
+    for number in range(GUESTS):
+        # Unique for the first 210 000 numbers
+        ssn = f"{1940 + number % 60}{number % 12 + 1:02d}{number % 28 + 1:02d}{number % 10000:04d}"
+        guest = {"name": f"Guest {number}", "age": str(18 + number % 70)}
+        if number % 2:
+            users[ssn] = guest
+        else:
+            old[ssn] = {**guest, "total registrations": str(number % 9 + 1)}
+
+    rooms = {str(number + 1): {
+        "name": "JuniorSuite",
+        "price": "19.99",
+        "capacity": "4",
+        "state": "vacant",
+        "description": "This is a room fitted for average income earners.",
+        "misc": ["2xDoubleBed", "wifi", "tv", "fridge", "microwave"],
+        "user": "",
+        "message": "",
+    } for number in range(ROOMS)}
+    return {"users": users, "rooms": rooms, "active": {}, "old": old}
+
+
+def best_of(function) -> float:
+    """Returns the fastest of REPEATS runs in milliseconds"""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def bench():
+    hotel = make_hotel()
+    print(f"{GUESTS} guests, {ROOMS} rooms, best of {REPEATS}")
+    print(f"{'format':<8}{'save ms':>10}{'load ms':>10}{'startup ms':>12}{'size kB':>10}")
+    for handler in (JsonHandling("bench_snapshot", fsync="never"),
+                    BinaryHandling("bench_snapshot", fsync="never")):
+        save = best_of(lambda: handler.pack_data(hotel))
+        load = best_of(handler.unpack_data)
+        startup = best_of(lambda: HotelManager(storage=handler))
+        size = os.path.getsize(handler.full_path) / 1024
+        print(f"{handler.EXTENSION:<8}{save:>10.1f}{load:>10.1f}{startup:>12.1f}{size:>10.0f}")
+
+
+if __name__ == "__main__":
+    try:
+        bench()
+    finally:
+        for file in glob.glob(
+                os.path.join(os.path.dirname(__file__), "..", "src", "json",
+                             "bench_snapshot*")):
+            os.remove(file)
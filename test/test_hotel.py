@@ -0,0 +1,146 @@
+"""
+Date: 18-10-2026
+Info: Regression tests of HotelManager, each hotel is stored as
+    src/json/test_hotel_*.json and removed afterwards.
+
+Run from the repository root: python -m pytest -q test/test_hotel.py
+"""
+import datetime
+import glob
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from hotel import HotelManager, SqliteHandling
+
+JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "json")
+
+
+@pytest.fixture
+def hotel():
+    """A hotel with two vacant rooms and two registered guests"""
+    hotel = HotelManager("test_hotel_regression.json")
+    hotel.add_room("Single", "10", "1", "vacant", "", [])
+    hotel.add_room("Double", "20", "2", "vacant", "", [])
+    hotel.register_user("199001010001", "Alice", "30")
+    hotel.register_user("199001010002", "Bob", "31")
+    yield hotel
+    for file in glob.glob(os.path.join(JSON_PATH, "test_hotel_*")):
+        os.remove(file)
+
+
+def test_edit_booking_keeps_room_reserved_tonight(hotel):
+    """Moving to a room another guest reserved for tonight fails without changes"""
+    first, second = list(hotel.rooms)[-2:]
+    today = datetime.date.today()
+    assert hotel.add_booking("199001010001", first, "")
+    assert hotel.add_reservation("199001010002", second, today,
+                                 today + datetime.timedelta(days=1))
+
+    assert not hotel.edit_booking("199001010001", second)
+    assert hotel.active["199001010001"].room == first
+    assert hotel.rooms[first].user == "199001010001"
+    assert hotel.check_integrity() == []
+
+
+def test_journal_replays_booking_on_its_own_day(hotel):
+    """A booking made the night before a reservation starts survives the replay"""
+    journaled = HotelManager("test_hotel_journal.json", journal=True)
+    journaled.add_room("Single", "10", "1", "vacant", "", [])
+    journaled.register_user("199001010001", "Alice", "30")
+    journaled.register_user("199001010002", "Bob", "31")
+    room = list(journaled.rooms)[-1]
+    today = datetime.date.today()
+    tomorrow = today + datetime.timedelta(days=1)
+    assert journaled.add_reservation("199001010002", room, tomorrow.isoformat(),
+                                     (tomorrow + datetime.timedelta(days=1)).isoformat())
+    assert journaled.add_booking("199001010001", room, "")
+
+    # Replayed the next day: every date in the journal moves one day back
+    def day_before(value):
+        if isinstance(value, str) and value[:4].isdigit() and value.count("-") == 2:
+            return (datetime.date.fromisoformat(value) - datetime.timedelta(days=1)).isoformat()
+        return value
+
+    path = journaled.storage.journal_path
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    with open(path, "w") as f:
+        for record in records:
+            record["date"] = day_before(record.get("date"))
+            record["args"] = [day_before(arg) for arg in record["args"]]
+            f.write(json.dumps(record) + "\n")
+
+    replayed = HotelManager("test_hotel_journal.json", journal=True)
+    assert replayed.active["199001010001"].room == room
+    assert replayed.rooms[room].user == "199001010001"
+
+
+def test_edit_user_keeps_ssn_of_another_guest(hotel):
+    """Changing a guest's ssn to a booked guest's ssn fails without changes"""
+    first, second = list(hotel.rooms)[-2:]
+    assert hotel.add_booking("199001010001", first, "")
+    assert hotel.add_booking("199001010002", second, "")
+
+    assert not hotel.edit_user("199001010001", new_ssn="199001010002")
+    assert hotel.users["199001010001"].name == "Alice"
+    assert hotel.users["199001010002"].name == "Bob"
+    assert hotel.active["199001010002"].room == second
+    assert hotel.check_integrity() == []
+
+
+def test_search_rooms_finds_parts_of_shipped_room_words(hotel):
+    """Words like "JuniorSuite" and "2xDoubleBed" in src/json/hotel.json are found by their parts"""
+    shutil.copy(os.path.join(JSON_PATH, "hotel.json"),
+                os.path.join(JSON_PATH, "test_hotel_shipped.json"))
+    shipped = HotelManager("test_hotel_shipped.json")
+    names = {room.name for room in shipped.rooms.values()}
+
+    assert {room.name for room in shipped.search_rooms("double bed wifi").values()} == names
+    assert [room.name for room in shipped.search_rooms("junior suite").values()] == ["JuniorSuite"]
+    assert [room.name for room in shipped.search_rooms("juniorsuite").values()] == ["JuniorSuite"]
+
+
+def test_room_misc_is_not_shared_when_changed_in_place(hotel):
+    """Identical rooms share their misc, changing one room's list leaves the others alone"""
+    hotel.add_room("Twin", "10", "2", "vacant", "", ["wifi"])
+    hotel.add_room("Twin", "10", "2", "vacant", "", ["wifi"])
+    first, second = list(hotel.rooms)[-2:]
+
+    hotel.rooms[first].misc.append("tv")
+    assert hotel.rooms[second].misc == ["wifi"]
+    hotel.edit_room(first, misc=["wifi", "tv"])
+    assert hotel.rooms[first].misc == ["wifi", "tv"]
+    assert hotel.rooms[second].misc == ["wifi"]
+
+
+def test_journal_mode_needs_a_journal_backend(hotel):
+    """SqliteHandling has no journal, asking for one fails before anything is loaded"""
+    storage = SqliteHandling("test_hotel_journal.db")
+    with pytest.raises(ValueError, match="journal"):
+        HotelManager(storage=storage, journal=True)
+    storage.connection.close()
+
+
+def test_remove_room_with_user_but_no_booking(hotel):
+    """A room whose user has no booking, like room 1 of src/json/hotel.json, can be removed"""
+    room = list(hotel.rooms)[-1]
+    hotel.rooms[room].user = "199001010001"
+
+    assert hotel.remove_room(room)
+    assert room not in hotel.rooms
+
+
+def test_remove_room_of_shipped_booking(hotel):
+    """Room 1 of src/json/hotel.json is booked without naming its user, removing it ends the booking"""
+    shutil.copy(os.path.join(JSON_PATH, "hotel.json"),
+                os.path.join(JSON_PATH, "test_hotel_shipped.json"))
+    shipped = HotelManager("test_hotel_shipped.json")
+
+    assert shipped.remove_room("1")
+    assert "123456789011" not in shipped.active
+    assert "123456789011" in shipped.users